@@ -1,5 +1,12 @@
 import sys
+import sqlite3
+import hashlib
+import threading
+import functools
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 
 # Add parent directory to path so we can import config
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -10,6 +17,9 @@ from qdrant_client import QdrantClient, models
 from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
 from fastembed import SparseTextEmbedding
 
+DENSE_MODEL  = "BAAI/bge-small-en-v1.5"
+SPARSE_MODEL = "prithivida/Splade_PP_en_v1"
+
 # ---------------------------------------------------------------------------
 # Safety Query Mapping
 # ---------------------------------------------------------------------------
@@ -60,65 +70,259 @@ PRIORITY_MAP = {
     },
 }
 
+# Inverted PRIORITY_MAP so get_priority is a single dict lookup
+LABEL_TO_PRIORITY = {label: level for level, labels in PRIORITY_MAP.items() for label in labels}
+
 RETRIEVAL_LIMITS = {"HIGH": 5, "MEDIUM": 3, "LOW": 1}
+
+# {query: (dense, sparse)} for every SAFETY_QUERY_MAP query, filled once by RAGRetriever.warmup()
+PRECOMPUTED_EMBEDDINGS: dict[str, tuple] = {}
 CONFIDENCE_THRESHOLD = 0.30   # lowered from 0.50 — Roboflow often returns 0.30-0.45 on real video
 SCORE_THRESHOLD      = 0.60
+SEMANTIC_CACHE_THRESHOLD = 0.95   # cosine similarity above which a prior search result is reused
+PREFETCH_MULTIPLIER = 2   # candidates per branch = limit * this, before fusion
+# RRF fuses the dense candidates by rank, so their order must be right: Qdrant
+# searches the int8 index with oversampling, then rescores the candidates against
+# the original float32 vectors. No-op on collections without quantization.
+DENSE_PREFETCH_PARAMS = models.SearchParams(
+    quantization=models.QuantizationSearchParams(ignore=False, rescore=True, oversampling=2.0)
+)
 
 
 def get_priority(label: str) -> str:
-    for level, labels in PRIORITY_MAP.items():
-        if label in labels:
-            return level
-    return "LOW"
+    return LABEL_TO_PRIORITY.get(label, "LOW")
 
 
 def build_query(label: str) -> str:
     return SAFETY_QUERY_MAP.get(label, f"{label} safety requirement construction site")
 
 
+def fusion_query():
+    """Server-side RRF fusion, parametrised with Config.RRF_K when set."""
+    if Config.RRF_K is None:
+        return models.FusionQuery(fusion=models.Fusion.RRF)
+    return models.RrfQuery(rrf=models.Rrf(k=Config.RRF_K))
+
+
+# ---------------------------------------------------------------------------
+# Persistent Embedding Cache
+# ---------------------------------------------------------------------------
+
+class EmbeddingCache:
+    """SQLite-backed store of (dense, sparse) query embeddings, shared across runs."""
+
+    def __init__(self, path: str = Config.EMBEDDING_CACHE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, dense BLOB, sparse_indices BLOB, sparse_values BLOB)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _key(query_text: str) -> str:
+        return hashlib.sha1(f"{DENSE_MODEL}|{SPARSE_MODEL}|{query_text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, queries: list[str]) -> dict:
+        """Return {query: (dense, sparse)} for every query already in the cache."""
+        keys = {self._key(q): q for q in queries}
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, dense, sparse_indices, sparse_values FROM embeddings WHERE key IN ({placeholders})",
+                list(keys),
+            ).fetchall()
+
+        hits = {}
+        for key, dense, indices, values in rows:
+            hits[keys[key]] = (
+                np.frombuffer(dense, dtype=np.float32).tolist(),
+                models.SparseVector(
+                    indices=np.frombuffer(indices, dtype=np.int64).tolist(),
+                    values=np.frombuffer(values, dtype=np.float32).tolist(),
+                ),
+            )
+        return hits
+
+    def put_many(self, vectors: dict):
+        """Store {query: (dense, sparse)} entries."""
+        rows = [
+            (
+                self._key(q),
+                np.asarray(dense, dtype=np.float32).tobytes(),
+                np.asarray(sparse.indices, dtype=np.int64).tobytes(),
+                np.asarray(sparse.values, dtype=np.float32).tobytes(),
+            )
+            for q, (dense, sparse) in vectors.items()
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+
+# ---------------------------------------------------------------------------
+# Shared resources — built once per process, reused by every RAGRetriever
+# ---------------------------------------------------------------------------
+
+@functools.cache
+def get_qdrant_client() -> QdrantClient:
+    # gRPC keeps one persistent channel and ships vectors as protobuf float arrays
+    return QdrantClient(
+        host=Config.QDRANT_HOST,
+        port=Config.QDRANT_PORT,
+        grpc_port=Config.QDRANT_GRPC_PORT,
+        prefer_grpc=True,
+        timeout=Config.QDRANT_TIMEOUT,
+    )
+
+
+@functools.cache
+def get_dense_embeddings() -> FastEmbedEmbeddings:
+    # FastEmbed already serves this model as the int8-quantized qdrant/bge-small-en-v1.5-onnx-q export
+    return FastEmbedEmbeddings(model_name=DENSE_MODEL, threads=Config.EMBEDDING_THREADS)
+
+
+@functools.cache
+def get_sparse_embeddings() -> SparseTextEmbedding:
+    return SparseTextEmbedding(model_name=SPARSE_MODEL, threads=Config.EMBEDDING_THREADS)
+
+
+@functools.cache
+def get_embedding_cache() -> EmbeddingCache:
+    return EmbeddingCache()
+
+
+@functools.cache
+def get_embed_pool() -> ThreadPoolExecutor:
+    # Dense and sparse ONNX sessions release the GIL, so the two embeds overlap
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="rag-embed")
+
+
 # ---------------------------------------------------------------------------
 # RAG Retriever
 # ---------------------------------------------------------------------------
 
 class RAGRetriever:
     def __init__(self):
-        self.client          = QdrantClient(host=Config.QDRANT_HOST, port=Config.QDRANT_PORT)
-        self.dense_embeddings  = FastEmbedEmbeddings(model_name="BAAI/bge-small-en-v1.5")
-        self.sparse_embeddings = SparseTextEmbedding(model_name="prithivida/Splade_PP_en_v1")
-        self.collection_name = Config.QDRANT_COLLECTION
-
-    def _embed(self, query_text: str):
-        """Return both dense and sparse vectors for a query string."""
-        dense  = self.dense_embeddings.embed_query(query_text)
-        sparse = list(self.sparse_embeddings.embed([query_text]))[0]
-        return dense, sparse
-
-    def _search(self, query_text: str, limit: int) -> list:
-        """Hybrid search using dense + sparse vectors fused with RRF."""
-        dense_vec, sparse_vec = self._embed(query_text)
-
-        results = self.client.query_points(
-            collection_name=self.collection_name,
+        self.client            = get_qdrant_client()
+        self.dense_embeddings  = get_dense_embeddings()
+        self.sparse_embeddings = get_sparse_embeddings()
+        self.collection_name   = Config.QDRANT_COLLECTION
+        self.embedding_cache   = get_embedding_cache()
+        self._embed_pool       = get_embed_pool()
+
+        self.warmup()
+
+    def warmup(self):
+        """Embed the closed SAFETY_QUERY_MAP vocabulary once per process (from disk cache when available)."""
+        missing = sorted(set(SAFETY_QUERY_MAP.values()) - PRECOMPUTED_EMBEDDINGS.keys())
+        if missing:
+            PRECOMPUTED_EMBEDDINGS.update(self._embed_batch(missing))
+
+    def _embed_batch(self, queries: list[str]) -> dict:
+        """
+        Embed queries, serving known ones from PRECOMPUTED_EMBEDDINGS and the on-disk cache.
+        Misses are embedded in one dense + one sparse call, run concurrently.
+        Returns {query: (dense, models.SparseVector)}, converted once so searches reuse it as-is.
+        """
+        if not queries:
+            return {}
+        vectors = {q: PRECOMPUTED_EMBEDDINGS[q] for q in queries if q in PRECOMPUTED_EMBEDDINGS}
+        if len(vectors) == len(queries):
+            return vectors
+        vectors.update(self.embedding_cache.get_many([q for q in queries if q not in vectors]))
+        misses  = [q for q in queries if q not in vectors]
+
+        if misses:
+            dense_future  = self._embed_pool.submit(self.dense_embeddings.embed_documents, misses)
+            sparse_future = self._embed_pool.submit(
+                lambda: list(self.sparse_embeddings.embed(misses, batch_size=len(misses)))
+            )
+            dense_vecs, sparse_vecs = dense_future.result(), sparse_future.result()
+            fresh = {
+                q: (d, models.SparseVector(indices=s.indices.tolist(), values=s.values.tolist()))
+                for q, d, s in zip(misses, dense_vecs, sparse_vecs)
+            }
+            self.embedding_cache.put_many(fresh)
+            vectors.update(fresh)
+
+        return vectors
+
+    @staticmethod
+    def _semantic_lookup(unit_vecs: list, pending: list, unit_vec: np.ndarray, limit: int) -> int | None:
+        """Index of a pending search near-identical to unit_vec that fetches at least limit points."""
+        if not unit_vecs:
+            return None
+        sims = np.stack(unit_vecs) @ unit_vec
+        best = int(np.argmax(sims))
+        if sims[best] >= SEMANTIC_CACHE_THRESHOLD and pending[best][3] >= limit:
+            return best
+        return None
+
+    @staticmethod
+    def _unit(dense_vec) -> np.ndarray:
+        vec = np.asarray(dense_vec, dtype=np.float32)
+        return vec / (np.linalg.norm(vec) or 1.0)
+
+    def _hybrid_request(self, dense_vec, sparse_vec, limit: int) -> dict:
+        """Keyword arguments shared by query_points and QueryRequest."""
+        return dict(
             prefetch=[
+                # Dense queries stay float32: the collection stores float32 vectors and
+                # Qdrant has no int8 query input. Over gRPC they already travel packed.
                 models.Prefetch(
                     query=dense_vec,
                     using="dense",
-                    limit=limit * 3,        # over-fetch before fusion
+                    limit=limit * PREFETCH_MULTIPLIER,   # over-fetch before fusion
+                    params=DENSE_PREFETCH_PARAMS,
                 ),
                 models.Prefetch(
-                    query=models.SparseVector(
-                        indices=sparse_vec.indices.tolist(),
-                        values=sparse_vec.values.tolist()
-                    ),
+                    query=sparse_vec,
                     using="sparse",
-                    limit=limit * 3,
+                    limit=limit * PREFETCH_MULTIPLIER,
                 ),
             ],
-            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            query=fusion_query(),
             limit=limit,
             score_threshold=SCORE_THRESHOLD,
+            with_payload=True,      # QueryRequest does not default to returning payloads
+        )
+
+    def _search_batch(self, plan: list[tuple]) -> dict:
+        """
+        Run every (query, dense, sparse, limit) in plan as a single query_batch_points
+        call. A query near-identical to an earlier one in the plan reuses that search.
+        Returns {query: points}.
+        """
+        # The semantic cache lives only for this call: the retriever is shared by
+        # every Streamlit session, and results must not outlive a re-ingestion
+        unit_vecs = []   # unit dense vectors of the searches actually sent
+        pending   = []   # (query, dense, sparse, limit) sent to Qdrant
+        reuse     = {}   # query -> (index into pending, limit)
+        for query_text, dense_vec, sparse_vec, limit in plan:
+            unit_vec = self._unit(dense_vec)
+            similar  = self._semantic_lookup(unit_vecs, pending, unit_vec, limit)
+            if similar is not None:
+                reuse[query_text] = (similar, limit)
+            else:
+                unit_vecs.append(unit_vec)
+                pending.append((query_text, dense_vec, sparse_vec, limit))
+
+        responses = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                models.QueryRequest(**self._hybrid_request(dense_vec, sparse_vec, limit))
+                for _, dense_vec, sparse_vec, limit in pending
+            ],
         )
-        return results.points if hasattr(results, "points") else results
+        results = {query_text: response.points
+                   for (query_text, *_), response in zip(pending, responses)}
+        for query_text, (idx, limit) in reuse.items():
+            results[query_text] = results[pending[idx][0]][:limit]
+        return results
 
     def retrieve_regulations(self, context: list[Detection]) -> list[Regulation]:
         """Retrieve relevant OSHA regulations based on detected violations."""
@@ -128,40 +332,51 @@ class RAGRetriever:
 
         print(f"Retrieving regulations for {len(context)} detections...")
 
-        regulations_dict = {}   # deduplicate by (text hash) so same regulation from
-                                # different labels doesn't appear twice
-        query_cache      = {}   # avoid re-embedding the same query string
-
+        # First pass: filter detections and work out one retrieval limit per
+        # unique query (labels like SUV/Sedan/Van share the same query string)
+        query_limits = {}
         for detection in context:
             # Skip low-confidence detections
             if detection.confidence < CONFIDENCE_THRESHOLD:
                 continue
 
-            priority = get_priority(detection.label)
-
             query_text = build_query(detection.label)
-            limit      = RETRIEVAL_LIMITS.get(priority, 1)
+            limit      = RETRIEVAL_LIMITS.get(get_priority(detection.label), 1)
+            query_limits[query_text] = max(limit, query_limits.get(query_text, 0))
+
+        if not query_limits:
+            print("✓ No detections above confidence threshold, skipping retrieval")
+            return []
+
+        queries = sorted(query_limits)
+
+        # Embed every unique query in a single batched call, then search
+        # them all in one Qdrant round-trip
+        vectors = self._embed_batch(queries)
+        search_results = self._search_batch([
+            (q, *vectors[q], query_limits[q]) for q in queries
+        ])
+
+        # Deduplicate by content so the same regulation retrieved for
+        # different labels only appears once
+        seen_keys   = set()
+        regulations = []
+
+        for query_text in queries:
+            for point in search_results[query_text]:
+                payload  = point.payload or {}
+                text     = payload.get("text", "")
+                text_key = hashlib.blake2b(text[:200].encode("utf-8", "ignore"), digest_size=8).digest()
+
+                if text_key in seen_keys:
+                    continue
+                seen_keys.add(text_key)
+                regulations.append(Regulation(
+                    citation=payload.get("source", "Unknown"),
+                    text=text,
+                    source="CAL_OSHA",
+                ))
 
-            # Use cached results if same query was already run
-            if query_text in query_cache:
-                points = query_cache[query_text]
-            else:
-                points = self._search(query_text, limit)
-                query_cache[query_text] = points
-
-            for point in points:
-                payload   = point.payload or {}
-                text      = payload.get("text", "")
-                text_key  = hash(text[:200])        # deduplicate by content
-
-                if text_key not in regulations_dict:
-                    regulations_dict[text_key] = Regulation(
-                        citation=payload.get("source", "Unknown"),
-                        text=text,
-                        source="CAL_OSHA",
-                    )
-
-        regulations = list(regulations_dict.values())
         print(f"✓ Retrieved {len(regulations)} relevant regulations")
         return regulations
     
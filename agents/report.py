@@ -1,47 +1,82 @@
+import io
 import os
 import sys
-import json
+import orjson
+import copy
+import hashlib
+import tempfile
+import functools
 from pathlib import Path
-from collections import Counter
+from collections import defaultdict
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from datetime import datetime
-from docx import Document
-from docx.shared import Pt, RGBColor, Inches
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
-
-# ReportLab — pure Python PDF, no LibreOffice needed
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
-)
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
-
-from schemas import ProcessingResult, AlertLevel, Detection
+from xml.sax.saxutils import escape as xml_escape
+
+# python-docx and ReportLab (pure Python PDF, no LibreOffice needed) are
+# imported inside the builders, so importing this module stays cheap
+
+from schemas import ProcessingResult, AlertLevel, Detection, is_machinery
 from config import Config
 import re
 
-ALERT_COLORS = {
-    AlertLevel.LOW:      ("70AD47", RGBColor(0x70, 0xAD, 0x47)),
-    AlertLevel.MEDIUM:   ("FFC000", RGBColor(0xFF, 0xC0, 0x00)),
-    AlertLevel.HIGH:     ("FF0000", RGBColor(0xFF, 0x00, 0x00)),
-    AlertLevel.CRITICAL: ("7030A0", RGBColor(0x70, 0x30, 0xA0)),
-}
-
-# ReportLab color equivalents
-ALERT_RL_COLORS = {
-    AlertLevel.LOW:      colors.HexColor("#548D2F"),
-    AlertLevel.MEDIUM:   colors.HexColor("#D7A91C"),
-    AlertLevel.HIGH:     colors.HexColor("#A63030"),
-    AlertLevel.CRITICAL: colors.HexColor("#7030A0"),
+@functools.cache
+def alert_colors() -> dict:
+    """python-docx (hex, RGBColor) per alert level."""
+    from docx.shared import RGBColor
+    return {
+        AlertLevel.LOW:      ("70AD47", RGBColor(0x70, 0xAD, 0x47)),
+        AlertLevel.MEDIUM:   ("FFC000", RGBColor(0xFF, 0xC0, 0x00)),
+        AlertLevel.HIGH:     ("FF0000", RGBColor(0xFF, 0x00, 0x00)),
+        AlertLevel.CRITICAL: ("7030A0", RGBColor(0x70, 0x30, 0xA0)),
+    }
+
+
+@functools.cache
+def alert_rl_colors() -> dict:
+    """ReportLab color equivalents."""
+    from reportlab.lib import colors
+    return {
+        AlertLevel.LOW:      colors.HexColor("#548D2F"),
+        AlertLevel.MEDIUM:   colors.HexColor("#D7A91C"),
+        AlertLevel.HIGH:     colors.HexColor("#A63030"),
+        AlertLevel.CRITICAL: colors.HexColor("#7030A0"),
+    }
+
+
+@functools.cache
+def _docx_units() -> tuple:
+    """(banner font size, white) python-docx values reused by every DOCX build."""
+    from docx.shared import Pt, RGBColor
+    return Pt(16), RGBColor(0xFF, 0xFF, 0xFF)
+
+
+@functools.cache
+def _docx_template_bytes() -> bytes:
+    """Default python-docx document with 1" margins, saved once per process."""
+    from docx import Document
+    from docx.shared import Inches
+
+    doc = Document()
+    for section in doc.sections:
+        section.top_margin    = Inches(1)
+        section.bottom_margin = Inches(1)
+        section.left_margin   = Inches(1)
+        section.right_margin  = Inches(1)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+VIOLATION_LABELS = frozenset({"NO-Hardhat", "NO-Mask", "NO-Safety Vest"})
+
+# Detection-table "Type" column per summary entry category
+CATEGORY_DISPLAY = {
+    "violation": "VIOLATION",
+    "equipment": "Equipment",
+    "object":    "Person/Object",
 }
 
-VIOLATION_LABELS = {"NO-Hardhat", "NO-Mask", "NO-Safety Vest"}
-MACHINERY_LABELS = {"Excavator", "Wheel Loader", "Machinery", "Dump Truck", "machinery"}
-
 REPORT_SYSTEM_PROMPT = """You are a senior construction site safety officer writing a formal incident report for legal and compliance purposes.
 
 You will be given JSON data containing:
@@ -50,6 +85,7 @@ You will be given JSON data containing:
 - violations: the specific PPE/safety violations (subset of raw_detections)
 - equipment_on_site: heavy machinery detected
 - workers_detected: number of people observed
+- frames_analyzed: number of video frames the detections were drawn from
 - applicable_regulations: OSHA/CAL-OSHA regulations retrieved from the compliance database
 
 Write a detailed, professional safety incident report with EXACTLY these sections using markdown headings:
@@ -94,65 +130,263 @@ For each violation type, provide specific actionable steps:
 Use formal, precise language. Reference actual detection counts and confidence scores throughout."""
 
 
+# Control characters that are not allowed in XML 1.0 text nodes
+XML_INVALID_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+_RE_BOLD   = re.compile(r'\*\*(.*?)\*\*')   # **bold**
+_RE_ITALIC = re.compile(r'\*(.*?)\*')       # *italic*
+_RE_UBOLD  = re.compile(r'__(.*?)__')       # __bold__
+
+
 def _clean_inline_markdown(text: str) -> str:
     """Remove bold/italic markdown markers from inline text."""
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # **bold**
-    text = re.sub(r'\*(.*?)\*', r'\1', text)        # *italic*
-    text = re.sub(r'__(.*?)__', r'\1', text)        # __bold__
+    if "*" not in text and "_" not in text:   # most prose lines have no markers
+        return text
+    text = _RE_BOLD.sub(r'\1', text)
+    text = _RE_ITALIC.sub(r'\1', text)
+    text = _RE_UBOLD.sub(r'\1', text)
     return text
 
-def set_cell_bg(cell, hex_color: str):
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
+def _line_kind(line: str) -> tuple[str, str]:
+    """Classify one stripped markdown line by its first character: (kind, raw_text)."""
+    if not line:
+        return "blank", ""
+    c = line[0]
+    if c == "#":
+        n = len(line) - len(line.lstrip("#"))
+        if line[n:n + 1].isspace():
+            return f"h{min(n, 3)}", line[n:].lstrip()
+    elif c in "-*" and line[1:2].isspace():
+        return "bullet", line[2:].lstrip()
+    return "body", line
+
+
+# python-docx paragraph style per markdown line kind (None = Normal)
+DOCX_LINE_STYLES = {
+    "blank":  None,
+    "h1":     "Heading1",
+    "h2":     "Heading2",
+    "h3":     "Heading3",
+    "bullet": "ListBullet",
+    "body":   None,
+}
+
+
+def _parse_report_markdown(report_text: str) -> list[tuple[str, str]]:
+    """
+    Parse the LLM markdown once into (kind, cleaned_text) tuples shared by the
+    DOCX and PDF builders. kind is one of blank, h1, h2, h3, bullet, body.
+    """
+    parsed = []
+    for line in report_text.split("\n"):
+        kind, text = _line_kind(line.strip())
+        parsed.append((kind, _clean_inline_markdown(text) if text else text))
+    return parsed
+
+
+@functools.lru_cache(maxsize=None)
+def _docx_paragraph_open(style_id: str | None) -> str:
+    """Opening <w:p> plus its <w:pPr>; a handful of styles, so built once each."""
+    return f'<w:p><w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>' if style_id else "<w:p>"
+
+
+def _docx_paragraph_xml(text: str = "", style_id: str | None = None) -> str:
+    """Raw <w:p> markup for a single-run paragraph with an optional paragraph style."""
+    if not text:
+        return f"{_docx_paragraph_open(style_id)}</w:p>"
+    text = xml_escape(XML_INVALID_RE.sub("", text))
+    return f'{_docx_paragraph_open(style_id)}<w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+
+def _docx_field_xml(label: str, value: str) -> str:
+    """Raw <w:p> markup for a "Label: value" line with the label in bold."""
+    value = xml_escape(XML_INVALID_RE.sub("", value))
+    return (f'<w:p><w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">{xml_escape(label)}</w:t></w:r>'
+            f'<w:r><w:t xml:space="preserve">{value}</w:t></w:r></w:p>')
+
+
+def _docx_append_xml(doc, paragraphs_xml: list[str]):
+    """Parse <w:p> markup as one fragment and append it to the document body."""
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import qn, nsdecls
+
+    fragment = parse_xml(f"<w:body {nsdecls('w')}>{''.join(paragraphs_xml)}</w:body>")
+    sect_pr  = doc.element.body.find(qn("w:sectPr"))   # must stay the last body child
+    for p in list(fragment):
+        sect_pr.addprevious(p)
+
+
+def _docx_row_xml(values: list[str], widths: list[int], fill: str | None = None,
+                  header: bool = False) -> str:
+    """Raw <w:tr> markup: one single-run cell per value, optional shading, bold white header text."""
+    shd = f'<w:shd w:val="clear" w:color="auto" w:fill="{fill}"/>' if fill else ""
+    rpr = '<w:rPr><w:b/><w:color w:val="FFFFFF"/></w:rPr>' if header else ""
+    cells = "".join(
+        f'<w:tc><w:tcPr><w:tcW w:w="{width}" w:type="dxa"/>{shd}</w:tcPr>'
+        f'<w:p><w:r>{rpr}<w:t xml:space="preserve">{xml_escape(XML_INVALID_RE.sub("", value))}</w:t></w:r></w:p></w:tc>'
+        for value, width in zip(values, widths)
+    )
+    return f"<w:tr>{cells}</w:tr>"
+
+
+@functools.lru_cache(maxsize=None)
+def _shading_template(hex_color: str):
+    """Prebuilt <w:shd> for a fill colour; callers append a deepcopy."""
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
     shd = OxmlElement("w:shd")
     shd.set(qn("w:val"), "clear")
     shd.set(qn("w:color"), "auto")
     shd.set(qn("w:fill"), hex_color)
-    tcPr.append(shd)
+    return shd
+
+
+def set_cell_bg(cell, hex_color: str):
+    cell._tc.get_or_add_tcPr().append(copy.deepcopy(_shading_template(hex_color)))
+
+
+@functools.cache
+def _make_pdf_styles() -> dict:
+    """ReportLab paragraph styles for _build_pdf, built once per process."""
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    styles = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle(
+            "ReportTitle", parent=styles["Title"],
+            fontSize=20, spaceAfter=6, textColor=colors.HexColor("#1a1a2e")
+        ),
+        "h1": ParagraphStyle(
+            "H1", parent=styles["Heading1"],
+            fontSize=14, spaceBefore=14, spaceAfter=4,
+            textColor=colors.HexColor("#2E3A4A"),
+            borderPad=4
+        ),
+        "body": ParagraphStyle(
+            "Body", parent=styles["Normal"],
+            fontSize=10, spaceAfter=6, leading=14
+        ),
+        "bullet": ParagraphStyle(
+            "Bullet", parent=styles["Normal"],
+            fontSize=10, spaceAfter=3, leftIndent=20, leading=14,
+            bulletIndent=10
+        ),
+        # Risk-score cell is tinted with the alert colour, one style per level
+        "banner_score": {
+            level: ParagraphStyle("banner_l", fontSize=14, textColor=color)
+            for level, color in alert_rl_colors().items()
+        },
+        "banner_level": ParagraphStyle(
+            "banner_r", fontSize=14, textColor=colors.white, alignment=TA_CENTER
+        ),
+    }
 
 
 class ReportGenerator:
-    def __init__(self):
+    @functools.cached_property
+    def model(self):
+        # Deferred so boto3 and the Bedrock client load only when a report
+        # actually needs the model, not when the pipeline is constructed
         from model import BedrockModel
-        self.model = BedrockModel.get_instance()
+        return BedrockModel.get_instance()
 
     def generate_report(self, result: ProcessingResult, detections: list[Detection] = None) -> str:
         print("Generating report...")
-        ra         = result.risk_assessment
-        detections = detections or []
+        now = datetime.now()
+        raw_detections_summary, context = self._build_context(result, detections or [], now)
+        report_text = self._report_text(result, context)
+        return self._write_reports(result, report_text, raw_detections_summary, now)
+
+    def generate_reports_batch(self, results: list[ProcessingResult],
+                               detections: list[list[Detection]] = None,
+                               max_workers: int = 4) -> list[str]:
+        """
+        Generate reports for several videos at once.
+        Bedrock calls run concurrently (the boto3 client is thread-safe), so a
+        backlog waits roughly one LLM round-trip instead of one per video.
+        Returns the DOCX paths in the same order as results.
+        """
+        print(f"Generating {len(results)} reports...")
+        now        = datetime.now()
+        detections = detections or [None] * len(results)
+        prepared   = [self._build_context(r, d or [], now) for r, d in zip(results, detections)]
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report-llm") as pool:
+            texts = list(pool.map(self._report_text, results, [context for _, context in prepared]))
+
+        return [
+            self._write_reports(result, report_text, raw_detections_summary, now)
+            for result, report_text, (raw_detections_summary, _) in zip(results, texts, prepared)
+        ]
 
-        # Build per-label stats from raw detections
-        label_stats = {}
+    def generate_reports(self, results: list[ProcessingResult],
+                         detections: list[list[Detection]] = None,
+                         max_workers: int = None) -> list[str]:
+        """
+        Generate reports for a backlog of videos across worker processes.
+        Document building is CPU-bound Python, so processes scale it past the
+        GIL. Workers are spawned (not forked) so each builds its own Bedrock
+        client. Returns the DOCX paths in the same order as results.
+        """
+        print(f"Generating {len(results)} reports across processes...")
+        detections = detections or [None] * len(results)
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_report_worker,
+        ) as pool:
+            return list(pool.map(_generate_report_in_worker, results, detections))
+
+    def _build_context(self, result: ProcessingResult, detections: list[Detection],
+                       now: datetime) -> tuple[list, dict]:
+        """Return (raw_detections_summary, LLM context) for one video."""
+        ra = result.risk_assessment
+
+        # Build per-label [count, confidence_sum] from raw detections in one pass
+        stats = defaultdict(lambda: [0, 0.0])
         for d in detections:
-            if d.label not in label_stats:
-                label_stats[d.label] = {"count": 0, "confidence_sum": 0.0}
-            label_stats[d.label]["count"]          += 1
-            label_stats[d.label]["confidence_sum"] += d.confidence
-
-        raw_detections_summary = [
-            {
-                "label":              label,
-                "count":              stats["count"],
-                "avg_confidence":     f"{stats['confidence_sum'] / stats['count']:.1%}",
-                "is_violation":       label in VIOLATION_LABELS,
-                "is_heavy_equipment": label in MACHINERY_LABELS,
+            s = stats[d.label]
+            s[0] += 1
+            s[1] += d.confidence
+
+        raw_detections_summary = []
+        violations_summary     = []
+        equipment_summary      = []
+        for label, (count, confidence_sum) in sorted(stats.items()):
+            category = (
+                "violation" if label in VIOLATION_LABELS else
+                "equipment" if is_machinery(label) else
+                "object"
+            )
+            entry = {
+                "label":          label,
+                "count":          count,
+                # Fraction in [0, 1]; rendered as a percentage at each output site
+                "avg_confidence": round(confidence_sum / count, 4),
+                "category":       category,
             }
-            for label, stats in sorted(label_stats.items())
-        ]
+            raw_detections_summary.append(entry)
+            if category == "violation":
+                violations_summary.append(entry)
+            elif category == "equipment":
+                equipment_summary.append(entry)
 
-        violations_summary = [d for d in raw_detections_summary if d["is_violation"]]
-        equipment_summary  = [d for d in raw_detections_summary if d["is_heavy_equipment"]]
-        workers_detected   = label_stats.get("Person", {}).get("count", 0)
+        workers_detected = stats["Person"][0] if "Person" in stats else 0
 
+        # Key order matters: bulk, slow-changing sections first and volatile
+        # fields (score, video name, timestamp) last, so the serialized prompt
+        # shares the longest possible prefix across videos for provider caching
         context = {
-            "video_id":        os.path.basename(result.video_id),
-            "analysis_time":   datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "risk_score":      ra.risk_score,
-            "alert_level":     ra.alert_level.value,
             "raw_detections":  raw_detections_summary,
             "violations":      violations_summary,
             "equipment_on_site": equipment_summary,
-            "workers_detected":  workers_detected,
+            "applicable_regulations": [
+                {"citation": r.citation, "full_text": r.text, "source": r.source}
+                for r in result.regulations
+            ],
             "risk_assessor_violations": [
                 {
                     "type":      v.type,
@@ -161,20 +395,25 @@ class ReportGenerator:
                 }
                 for v in ra.violations
             ],
-            "applicable_regulations": [
-                {"citation": r.citation, "full_text": r.text, "source": r.source}
-                for r in result.regulations
-            ],
+            "risk_score":      ra.risk_score,
+            "alert_level":     ra.alert_level.value,
+            "workers_detected":  workers_detected,
+            "frames_analyzed": result.frames_analyzed,
+            "video_id":        os.path.basename(result.video_id),
+            "analysis_time":   now.strftime("%Y-%m-%d %H:%M:%S"),
         }
+        return raw_detections_summary, context
 
+    def _report_text(self, result: ProcessingResult, context: dict) -> str:
         try:
-            report_text = self.model.invoke(
-                REPORT_SYSTEM_PROMPT,
-                json.dumps(context, indent=2)
-            )
+            return self._invoke_cached(context)
         except Exception as e:
             print(f"⚠ LLM report generation failed: {e}")
-            report_text = self._fallback_report(result, violations_summary)
+            return self._fallback_report(result, context["violations"])
+
+    def _write_reports(self, result: ProcessingResult, report_text: str,
+                       raw_detections_summary: list, now: datetime) -> str:
+        generated_at = now.strftime("%B %d, %Y %H:%M:%S")   # shared by the DOCX and PDF headers
 
         safe_name   = os.path.basename(result.video_id).replace(" ", "_")
         base_path   = os.path.join(Config.REPORTS_DIR, safe_name)
@@ -184,13 +423,69 @@ class ReportGenerator:
         docx_path = base_path + "_report.docx"
         pdf_path  = base_path + "_report.pdf"
 
-        self._build_docx(result, report_text, raw_detections_summary, docx_path)
-        self._build_pdf(result, report_text, raw_detections_summary, pdf_path)
+        parsed = _parse_report_markdown(report_text)
+
+        builders = [(self._build_docx, docx_path)]
+        if Config.PDF_BACKEND == "reportlab":
+            builders.append((self._build_pdf, pdf_path))
+
+        # The builders share only read-only inputs and write distinct files
+        with ThreadPoolExecutor(max_workers=len(builders), thread_name_prefix="report-build") as pool:
+            futures = [
+                pool.submit(build, result, parsed, raw_detections_summary, path, generated_at)
+                for build, path in builders
+            ]
+            for future in futures:
+                future.result()   # re-raise builder errors
 
-        print(f"✓ DOCX saved: {docx_path}")
-        print(f"✓ PDF saved:  {pdf_path}")
+        for _, path in builders:
+            print(f"✓ Saved: {path}")
         return docx_path  # return DOCX as primary output (PDF also saved on disk)
 
+    # ── LLM call with exact-match disk cache ─────────────────────────────────
+    def _cache_key(self, context: dict) -> str:
+        # analysis_time changes on every run and would make every key unique
+        stable = {k: v for k, v in context.items() if k != "analysis_time"}
+        payload = orjson.dumps(stable, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(
+            self.model.model_id.encode() + REPORT_SYSTEM_PROMPT.encode() + payload
+        ).hexdigest()
+
+    def _invoke_cached(self, context: dict) -> str:
+        """Return the LLM report for context, reusing a cached response for an identical one."""
+        # Compact JSON: indentation only adds billed input tokens. Key order is
+        # kept as built (volatile fields last) rather than sorted.
+        user_message = orjson.dumps(
+            context, option=orjson.OPT_INDENT_2 if Config.DEBUG else 0
+        ).decode()
+        if not Config.LLM_CACHE_ENABLED:
+            return self.model.invoke(REPORT_SYSTEM_PROMPT, user_message, cache_system=True)
+
+        cache_path = os.path.join(Config.LLM_CACHE_DIR, f"{self._cache_key(context)}.txt")
+        if os.path.exists(cache_path):
+            print("✓ Using cached LLM report")
+            with open(cache_path, encoding="utf-8") as f:
+                return f.read()
+
+        report_text = self.model.invoke(REPORT_SYSTEM_PROMPT, user_message, cache_system=True)
+
+        # Write atomically so a concurrent run never reads a half-written file.
+        # The report is already paid for: a failed cache write must not discard it
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=Config.LLM_CACHE_DIR, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(report_text)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"⚠ Could not cache LLM report: {e}")
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+        return report_text
+
     def _fallback_report(self, result: ProcessingResult, violations_summary: list) -> str:
         ra    = result.risk_assessment
         lines = [
@@ -202,7 +497,7 @@ class ReportGenerator:
         ]
         for v in violations_summary:
             lines.append(f"- {v['label']}: {v['count']} instances "
-                         f"(avg confidence: {v['avg_confidence']})")
+                         f"(avg confidence: {v['avg_confidence']:.1%})")
         lines += [
             "", "## 3. Recommended Actions",
             "Immediately halt work and ensure all workers are equipped with "
@@ -211,58 +506,41 @@ class ReportGenerator:
         return "\n".join(lines)
 
     # ── PDF builder (ReportLab) ───────────────────────────────────────────────
-    def _build_pdf(self, result: ProcessingResult, report_text: str,
-                   raw_detections_summary: list, output_path: str):
-        doc = SimpleDocTemplate(
-            output_path,
-            pagesize=letter,
-            leftMargin=inch, rightMargin=inch,
-            topMargin=inch,  bottomMargin=inch
+    def _build_pdf(self, result: ProcessingResult, parsed: list[tuple[str, str]],
+                   raw_detections_summary: list, output_path: str, generated_at: str):
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.units import inch
+        from reportlab.lib import colors
+        from reportlab.platypus import (
+            SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
         )
+
         ra      = result.risk_assessment
-        styles  = getSampleStyleSheet()
         story   = []
+        styles  = _make_pdf_styles()
 
-        # Custom styles
-        title_style = ParagraphStyle(
-            "ReportTitle", parent=styles["Title"],
-            fontSize=20, spaceAfter=6, textColor=colors.HexColor("#1a1a2e")
-        )
-        h1_style = ParagraphStyle(
-            "H1", parent=styles["Heading1"],
-            fontSize=14, spaceBefore=14, spaceAfter=4,
-            textColor=colors.HexColor("#2E3A4A"),
-            borderPad=4
-        )
-        body_style = ParagraphStyle(
-            "Body", parent=styles["Normal"],
-            fontSize=10, spaceAfter=6, leading=14
-        )
-        bullet_style = ParagraphStyle(
-            "Bullet", parent=styles["Normal"],
-            fontSize=10, spaceAfter=3, leftIndent=20, leading=14,
-            bulletIndent=10
-        )
+        title_style  = styles["title"]
+        h1_style     = styles["h1"]
+        body_style   = styles["body"]
+        bullet_style = styles["bullet"]
 
         # ── Title ─────────────────────────────────────────────────────────────
         story.append(Paragraph("Construction Site Safety Incident Report", title_style))
         story.append(Paragraph(
             f"<b>Video:</b> {os.path.basename(result.video_id)} &nbsp;&nbsp; "
-            f"<b>Generated:</b> {datetime.now().strftime('%B %d, %Y %H:%M:%S')}",
+            f"<b>Generated:</b> {generated_at}",
             body_style
         ))
         story.append(HRFlowable(width="100%", thickness=1, color=colors.grey))
         story.append(Spacer(1, 10))
 
         # ── Risk score banner ─────────────────────────────────────────────────
-        alert_color = ALERT_RL_COLORS.get(ra.alert_level, colors.black)
+        alert_color = alert_rl_colors().get(ra.alert_level, colors.black)
         banner_data = [[
-            Paragraph(f"<b>Risk Score: {ra.risk_score}/100</b>", ParagraphStyle(
-                "banner_l", fontSize=14, textColor=alert_color
-            )),
-            Paragraph(f"<b>Alert Level: {ra.alert_level.value}</b>", ParagraphStyle(
-                "banner_r", fontSize=14, textColor=colors.white, alignment=TA_CENTER
-            )),
+            Paragraph(f"<b>Risk Score: {ra.risk_score}/100</b>",
+                      styles["banner_score"][ra.alert_level]),
+            Paragraph(f"<b>Alert Level: {ra.alert_level.value}</b>",
+                      styles["banner_level"]),
         ]]
         banner_tbl = Table(banner_data, colWidths=[3.5*inch, 3.5*inch])
         banner_tbl.setStyle(TableStyle([
@@ -282,14 +560,6 @@ class ReportGenerator:
         if raw_detections_summary:
             story.append(Paragraph("Detection Summary", h1_style))
             tbl_data = [["Label", "Count", "Avg Confidence", "Type"]]
-            for d in raw_detections_summary:
-                type_label = "VIOLATION" if d["is_violation"] else \
-                             "Equipment"  if d["is_heavy_equipment"] else "Person/Object"
-                tbl_data.append([
-                    d["label"], str(d["count"]), d["avg_confidence"], type_label
-                ])
-
-            det_tbl = Table(tbl_data, colWidths=[2.2*inch, 0.8*inch, 1.5*inch, 1.5*inch])
             tbl_style = [
                 ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#2E3A4A")),
                 ("TEXTCOLOR",  (0, 0), (-1, 0), colors.white),
@@ -300,107 +570,124 @@ class ReportGenerator:
                 ("VALIGN",     (0, 0), (-1, -1), "MIDDLE"),
                 ("PADDING",    (0, 0), (-1, -1), 6),
             ]
-            # Highlight violation rows
+            violation_bg = colors.HexColor("#FFE0E0")
             for i, d in enumerate(raw_detections_summary, start=1):
-                if d["is_violation"]:
-                    tbl_style.append(("BACKGROUND", (0, i), (-1, i), colors.HexColor("#FFE0E0")))
+                tbl_data.append([
+                    d["label"], str(d["count"]), f"{d['avg_confidence']:.1%}",
+                    CATEGORY_DISPLAY[d["category"]],
+                ])
+                # Highlight violation rows
+                if d["category"] == "violation":
+                    tbl_style.append(("BACKGROUND", (0, i), (-1, i), violation_bg))
                     tbl_style.append(("FONTNAME",   (0, i), (-1, i), "Helvetica-Bold"))
 
+            det_tbl = Table(tbl_data, colWidths=[2.2*inch, 0.8*inch, 1.5*inch, 1.5*inch])
             det_tbl.setStyle(TableStyle(tbl_style))
             story.append(det_tbl)
             story.append(Spacer(1, 16))
 
         # ── LLM report body ───────────────────────────────────────────────────
-        for line in report_text.split("\n"):
-            line = line.strip()
-            if not line:
-                story.append(Spacer(1, 6))
-                continue
-            if line.startswith("### "):
-                story.append(Paragraph(_clean_inline_markdown(line[4:].strip()), h1_style))
-            elif line.startswith("## "):
-                story.append(HRFlowable(width="100%", thickness=0.5, color=colors.lightgrey))
-                story.append(Paragraph(_clean_inline_markdown(line[3:].strip()), h1_style))
-            elif line.startswith("# "):
-                story.append(Paragraph(_clean_inline_markdown(line[2:].strip()), title_style))
-            elif line.startswith("- ") or line.startswith("* "):
-                story.append(Paragraph(f"• {_clean_inline_markdown(line[2:].strip())}", bullet_style))
-            else:
-                story.append(Paragraph(_clean_inline_markdown(line), body_style))
+        render = {
+            "blank":  lambda text: [Spacer(1, 6)],
+            "h1":     lambda text: [Paragraph(text, title_style)],
+            "h2":     lambda text: [
+                HRFlowable(width="100%", thickness=0.5, color=colors.lightgrey),
+                Paragraph(text, h1_style),
+            ],
+            "h3":     lambda text: [Paragraph(text, h1_style)],
+            "bullet": lambda text: [Paragraph(f"• {text}", bullet_style)],
+            "body":   lambda text: [Paragraph(text, body_style)],
+        }
+        for kind, text in parsed:
+            story.extend(render[kind](text))
 
+        buf = io.BytesIO()
+        doc = SimpleDocTemplate(
+            buf,
+            pagesize=letter,
+            leftMargin=inch, rightMargin=inch,
+            topMargin=inch,  bottomMargin=inch
+        )
         doc.build(story)
+        Path(output_path).write_bytes(buf.getbuffer())
 
     # ── DOCX builder (kept as backup) ────────────────────────────────────────
-    def _build_docx(self, result: ProcessingResult, report_text: str,
-                    raw_detections_summary: list, output_path: str):
-        doc = Document()
+    def _build_docx(self, result: ProcessingResult, parsed: list[tuple[str, str]],
+                    raw_detections_summary: list, output_path: str, generated_at: str):
+        from docx import Document
+        from docx.shared import RGBColor
+        from docx.oxml import parse_xml
+        from docx.oxml.ns import nsdecls
+
+        banner_size, white = _docx_units()
+        doc = Document(io.BytesIO(_docx_template_bytes()))
         ra  = result.risk_assessment
 
-        for section in doc.sections:
-            section.top_margin    = Inches(1)
-            section.bottom_margin = Inches(1)
-            section.left_margin   = Inches(1)
-            section.right_margin  = Inches(1)
-
-        doc.add_heading("Construction Site Safety Incident Report", 0)
-        p = doc.add_paragraph()
-        p.add_run("Video File: ").bold = True
-        p.add_run(os.path.basename(result.video_id))
-        p2 = doc.add_paragraph()
-        p2.add_run("Report Generated: ").bold = True
-        p2.add_run(datetime.now().strftime("%B %d, %Y %H:%M:%S"))
-        doc.add_paragraph()
+        _docx_append_xml(doc, [
+            _docx_paragraph_xml("Construction Site Safety Incident Report", "Title"),
+            _docx_field_xml("Video File: ", os.path.basename(result.video_id)),
+            _docx_field_xml("Report Generated: ", generated_at),
+            _docx_paragraph_xml(),
+        ])
 
-        hex_color, rgb_color = ALERT_COLORS.get(ra.alert_level, ("000000", RGBColor(0, 0, 0)))
+        hex_color, rgb_color = alert_colors().get(ra.alert_level, ("000000", RGBColor(0, 0, 0)))
         tbl = doc.add_table(rows=1, cols=2)
         tbl.style = "Table Grid"
         cells = tbl.rows[0].cells
         set_cell_bg(cells[0], "F5F5F5")
         r0 = cells[0].paragraphs[0].add_run(f"Risk Score: {ra.risk_score}/100")
-        r0.bold = True; r0.font.size = Pt(16); r0.font.color.rgb = rgb_color
+        r0.bold = True; r0.font.size = banner_size; r0.font.color.rgb = rgb_color
         set_cell_bg(cells[1], hex_color)
         r1 = cells[1].paragraphs[0].add_run(f"Alert Level: {ra.alert_level.value}")
-        r1.bold = True; r1.font.size = Pt(16)
-        r1.font.color.rgb = RGBColor(0xFF, 0xFF, 0xFF)
+        r1.bold = True; r1.font.size = banner_size
+        r1.font.color.rgb = white
         doc.add_paragraph()
 
         if raw_detections_summary:
             doc.add_heading("Detection Summary", level=2)
-            dtbl = doc.add_table(rows=1, cols=4)
+            dtbl = doc.add_table(rows=0, cols=4)
             dtbl.style = "Table Grid"
-            for cell, label in zip(dtbl.rows[0].cells,
-                                   ["Label", "Count", "Avg Confidence", "Type"]):
-                run = cell.paragraphs[0].add_run(label)
-                run.bold = True
-                set_cell_bg(cell, "2E3A4A")
-                run.font.color.rgb = RGBColor(0xFF, 0xFF, 0xFF)
+
+            # All rows as one XML fragment appended straight to <w:tbl>,
+            # instead of add_row() + four .text assignments + shading per row
+            widths = [gc.w.twips for gc in dtbl._tbl.tblGrid.gridCol_lst]
+            rows_xml = [_docx_row_xml(
+                ["Label", "Count", "Avg Confidence", "Type"], widths,
+                fill="2E3A4A", header=True,
+            )]
             for d in raw_detections_summary:
-                row = dtbl.add_row().cells
-                row[0].text = d["label"]
-                row[1].text = str(d["count"])
-                row[2].text = d["avg_confidence"]
-                row[3].text = "VIOLATION" if d["is_violation"] else \
-                              "Equipment"  if d["is_heavy_equipment"] else "Person/Object"
-                if d["is_violation"]:
-                    for cell in row:
-                        set_cell_bg(cell, "FFE0E0")
+                rows_xml.append(_docx_row_xml(
+                    [
+                        d["label"],
+                        str(d["count"]),
+                        f"{d['avg_confidence']:.1%}",
+                        CATEGORY_DISPLAY[d["category"]],
+                    ],
+                    widths,
+                    fill="FFE0E0" if d["category"] == "violation" else None,
+                ))
+            fragment = parse_xml(f"<w:tbl {nsdecls('w')}>{''.join(rows_xml)}</w:tbl>")
+            for tr in list(fragment):
+                dtbl._tbl.append(tr)
             doc.add_paragraph()
 
-        for line in report_text.split("\n"):
-            line = line.strip()
-            if not line:
-                doc.add_paragraph()
-                continue
-            if line.startswith("### "):
-                doc.add_heading(_clean_inline_markdown(line[4:].strip()), level=3)
-            elif line.startswith("## "):
-                doc.add_heading(_clean_inline_markdown(line[3:].strip()), level=2)
-            elif line.startswith("# "):
-                doc.add_heading(_clean_inline_markdown(line[2:].strip()), level=1)
-            elif line.startswith("- ") or line.startswith("* "):
-                p = doc.add_paragraph(style="List Bullet")
-                p.add_run(_clean_inline_markdown(line[2:].strip()))
-            else:
-                doc.add_paragraph(_clean_inline_markdown(line))
-
-        doc.save(output_path)
\ No newline at end of file
+        # Build the LLM body as one XML fragment and splice it in once,
+        # instead of a python-docx add_paragraph/add_heading call per line
+        _docx_append_xml(doc, [_docx_paragraph_xml(text, DOCX_LINE_STYLES[kind]) for kind, text in parsed])
+
+        buf = io.BytesIO()
+        doc.save(buf)
+        Path(output_path).write_bytes(buf.getbuffer())
+
+
+# ── Process-pool workers for ReportGenerator.generate_reports ─────────────────
+_worker_generator: ReportGenerator = None
+
+
+def _init_report_worker():
+    global _worker_generator
+    _worker_generator = ReportGenerator()
+
+
+def _generate_report_in_worker(result: ProcessingResult, detections: list[Detection]) -> str:
+    return _worker_generator.generate_report(result, detections)
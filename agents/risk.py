@@ -1,11 +1,12 @@
-import json
-from schemas import Detection, RiskAssessment, AlertLevel, Violation, Regulation
+import orjson
+from operator import attrgetter
+from schemas import Detection, RiskAssessment, AlertLevel, Violation, is_machinery
 
-VIOLATION_LABELS = {"NO-Hardhat", "NO-Mask", "NO-Safety Vest"}
-MACHINERY_LABELS = {"Excavator", "Wheel Loader", "Machinery", "Dump Truck", "machinery"}
+VIOLATION_LABELS = frozenset({"NO-Hardhat", "NO-Mask", "NO-Safety Vest"})
+_get_label = attrgetter("label")
 
 SYSTEM_PROMPT = """You are a construction site safety expert.
-Given detected violations, equipment context, and relevant OSHA regulations,
+Given detected violations, equipment context, and the number of people nearby,
 return a JSON risk assessment with this exact structure:
 {
   "risk_score": <0-100 integer>,
@@ -33,14 +34,16 @@ class RiskAssessor:
         from model import BedrockModel
         self.model = BedrockModel.get_instance()
 
-    def assess(self, detections: list[Detection], regulations: list[Regulation] = None) -> RiskAssessment:
+    def assess(self, detections: list[Detection]) -> RiskAssessment:
         print("Assessing risk...")
         if not detections:
             return RiskAssessment(risk_score=0, alert_level=AlertLevel.LOW)
 
-        violations_found  = [d for d in detections if d.label in VIOLATION_LABELS]
-        equipment_present = [d for d in detections if d.label in MACHINERY_LABELS]
-        people_count      = sum(1 for d in detections if d.label == "Person")
+        # Read each label once instead of once per classification pass
+        labels            = list(map(_get_label, detections))
+        violations_found  = [d for d, l in zip(detections, labels) if l in VIOLATION_LABELS]
+        equipment_present = [d for d, l in zip(detections, labels) if is_machinery(l)]
+        people_count      = labels.count("Person")
 
         context = {
             "violations": [
@@ -49,14 +52,10 @@ class RiskAssessor:
             ],
             "heavy_equipment":  [e.label for e in equipment_present],
             "people_nearby":    people_count,
-            "relevant_regulations": [
-                {"citation": r.citation, "text": r.text[:300]}
-                for r in (regulations or [])
-            ],
         }
 
         try:
-            data = self.model.invoke_json(SYSTEM_PROMPT, json.dumps(context, indent=2))
+            data = self.model.invoke_json(SYSTEM_PROMPT, orjson.dumps(context).decode())
             return self._parse_response(data, violations_found, equipment_present)
         except Exception as e:
             print(f"⚠ Risk assessment failed: {e}, falling back to rule-based scoring")
@@ -1,88 +1,160 @@
+import functools
 import subprocess
+import cv2
 import numpy as np
-from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
 from schemas import Frame
 
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+
+MAX_SEEK_WORKERS = 8   # concurrent single-frame ffmpeg seeks per video
+PIPE_SIZE = 1 << 20    # 1 MB ffmpeg stdout pipe (Linux default is 64 KB)
+MAX_DIMENSION = 1280   # ffmpeg downscales larger frames before they are uploaded for detection
+JPEG_QUALITY = 90      # frames are kept JPEG-encoded; VisionDetector uploads these bytes as-is
+
+# Fit within MAX_DIMENSION x MAX_DIMENSION, keeping aspect ratio; never upscale
+SCALE_FILTER = (f"scale=w='min({MAX_DIMENSION},iw)':h='min({MAX_DIMENSION},ih)'"
+                ":force_original_aspect_ratio=decrease")
+
+
+def _grow_pipe(pipe):
+    """Enlarge a pipe's kernel buffer where supported, so a frame needs fewer reads."""
+    set_size = getattr(fcntl, "F_SETPIPE_SZ", None)   # Linux only; None without fcntl
+    if set_size is not None:
+        try:
+            fcntl.fcntl(pipe.fileno(), set_size, PIPE_SIZE)
+        except OSError:
+            pass   # above /proc/sys/fs/pipe-max-size; keep the default
+
+
+def _read_ppm_header(pipe) -> tuple[int, int] | None:
+    """Parse ffmpeg's "P6\\n<w> <h>\\n255\\n" header; None if it wrote no image."""
+    magic = pipe.readline()
+    if magic.strip() != b"P6":
+        return None
+    width, height = map(int, pipe.readline().split())
+    maxval = int(pipe.readline())
+    if maxval != 255:
+        raise RuntimeError(f"Expected an 8-bit PPM from ffmpeg, got maxval {maxval}")
+    return width, height
+
+
+def dhash(image: np.ndarray) -> int:
+    """64-bit difference hash: sign of horizontal gradients on a 9x8 grayscale thumbnail."""
+    small = cv2.resize(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), (9, 8), interpolation=cv2.INTER_AREA)
+    return int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), "big")
+
+
+@functools.cache
+def _hwaccel_args() -> list[str]:
+    """ffmpeg input flags for hardware decode, or [] when this ffmpeg build has none."""
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-hwaccels"], capture_output=True, text=True
+    )
+    # Output is a "Hardware acceleration methods:" header followed by one method per line
+    methods = result.stdout.strip().split("\n")[1:] if result.returncode == 0 else []
+    # "auto" picks the first usable method and falls back to software decode
+    return ["-hwaccel", "auto"] if any(m.strip() for m in methods) else []
+
 
 class VideoProcessor:
     def __init__(self, max_frames: int = 10):
         """Extract up to max_frames at 1fps from a video."""
         self.max_frames = max_frames
 
-    def _get_video_properties(self, video_path: str) -> dict:
-        """Get video fps and dimensions."""
+    def _extract_frame(self, video_path: str, timestamp: float) -> np.ndarray | None:
+        """
+        Decode the single frame at timestamp as a BGR array, or None past the end.
+        ffmpeg emits a PPM, whose header carries the dimensions, so no separate
+        ffprobe call is needed to size the read.
+        """
         cmd = [
-            "ffprobe", "-v", "error",
-            "-select_streams", "v:0",
-            "-show_entries", "stream=width,height,r_frame_rate",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            video_path
+            "ffmpeg", "-v", "error",
+            *_hwaccel_args(),
+            # -ss before -i seeks via the container index instead of decoding from the start
+            "-ss", f"{timestamp:.3f}", "-i", video_path,
+            "-frames:v", "1", "-vf", SCALE_FILTER,
+            # Force 8-bit RGB: ffmpeg would otherwise emit rgb48 PPMs for 10-bit
+            # sources and grayscale P5 for mono ones
+            "-pix_fmt", "rgb24",
+            "-f", "image2pipe", "-vcodec", "ppm", "-"
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise RuntimeError(f"ffprobe failed: {result.stderr.strip()}")
-
-        lines = result.stdout.strip().split("\n")
-        if len(lines) < 3:
-            raise RuntimeError(f"Unexpected ffprobe output: {result.stdout!r}")
-
-        width, height, fps_str = lines[0], lines[1], lines[2]
-
-        # Safe fps parsing — handles both '30' and '30000/1001', never uses eval
-        parts = fps_str.strip().split("/")
-        fps = int(parts[0]) / int(parts[1]) if len(parts) == 2 else float(parts[0])
+        # Unbuffered stdout: readinto fills the frame buffer straight from the pipe
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+        frame = None
+        try:
+            _grow_pipe(process.stdout)
+            size = _read_ppm_header(process.stdout)
+            if size is not None:
+                width, height = size
+                frame_size = width * height * 3
+                buf  = bytearray(frame_size)
+                view = memoryview(buf)
+                got  = 0
+                while got < frame_size:
+                    n = process.stdout.readinto(view[got:])
+                    if not n:
+                        break
+                    got += n
+                view.release()
+                if got == frame_size:
+                    frame = np.frombuffer(buf, dtype=np.uint8).reshape((height, width, 3))
+                    cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=frame)   # in place
+            stderr = process.stderr.read()
+        finally:
+            process.stdout.close()
+            process.stderr.close()
+            process.wait()
 
-        return {"fps": fps, "width": int(width), "height": int(height)}
+        # A seek past the end exits cleanly with no image; any non-zero exit is a
+        # real decode failure and must not pass for the end of the video
+        if process.returncode != 0:
+            message = (f"ffmpeg failed at {timestamp:.0f}s with return code {process.returncode}: "
+                       f"{stderr.decode(errors='replace').strip()}")
+            if frame is None:
+                raise RuntimeError(message)
+            print(f"⚠ {message}")
+        return frame
+
+    def _build_frame(self, video_path: str, idx: int) -> Frame | None:
+        """Decode second idx, hash it, and keep only its JPEG encoding; None past the end."""
+        image = self._extract_frame(video_path, float(idx))
+        if image is None:
+            return None
+        ok, jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if not ok:
+            raise RuntimeError(f"JPEG encoding failed for frame {idx}")
+        return Frame(
+            frame_num=idx,
+            timestamp=float(idx),   # fps=1 so frame N = second N
+            image_bytes=jpeg.tobytes(),
+            dhash=dhash(image),     # hashed once here, reused by every later dedupe
+        )
 
     def process(self, video_path: str) -> list[Frame]:
         """
         Extract frames at 1fps up to max_frames.
         Timestamp = frame index (seconds) since we extract at exactly 1fps.
+        Each second is an independent seek + single-frame decode, run concurrently;
+        seeks past the end of a short video come back empty and are dropped, while
+        a failed decode raises.
         """
         print(f"Processing video: {video_path}")
-        props = self._get_video_properties(video_path)
-        print(f"  {props['width']}x{props['height']} @ {props['fps']:.2f}fps")
-
-        cmd = [
-            "ffmpeg", "-i", video_path,
-            "-vf", "fps=1",
-            "-f", "image2pipe",
-            "-pix_fmt", "rgb24",
-            "-vcodec", "rawvideo", "-"
-        ]
-
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
 
         frames = []
-        frame_size = props["width"] * props["height"] * 3
-
-        try:
-            while len(frames) < self.max_frames:
-                frame_data = process.stdout.read(frame_size)
-                if len(frame_data) != frame_size:
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_frames, MAX_SEEK_WORKERS)),
+                                thread_name_prefix="ffmpeg-seek") as pool:
+            built = pool.map(
+                lambda idx: self._build_frame(video_path, idx),
+                range(self.max_frames),
+            )
+            for frame in built:
+                if frame is None:   # seeked past the last frame
                     break
-
-                frame_array = np.frombuffer(frame_data, dtype=np.uint8).reshape(
-                    (props["height"], props["width"], 3)
-                )
-
-                idx = len(frames)
-                frames.append(Frame(
-                    frame_num=idx,
-                    timestamp=float(idx),   # fps=1 so frame N = second N
-                    image=Image.fromarray(frame_array, "RGB")
-                ))
-
-        finally:
-            process.stdout.close()
-            process.stderr.close()
-            process.wait()
-            if process.returncode not in (0, None) and not frames:
-                raise RuntimeError(f"ffmpeg failed with return code {process.returncode}")
+                frames.append(frame)
 
         print(f"Extracted {len(frames)} frames")
         return frames
@@ -1,16 +1,28 @@
 import sys
+import base64
+import functools
 from pathlib import Path
 from collections import Counter
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from schemas import Frame, Detection
-from inference_sdk import InferenceHTTPClient
+from agents.video import dhash
+from inference_sdk import InferenceHTTPClient, InferenceConfiguration
 from config import Config
-from PIL import Image
 
+ROBOFLOW_MODEL_ID = "construction-site-safety/27"
 ROBOFLOW_CONFIDENCE_THRESHOLD = 0.30
-MAX_DIMENSION = 1280
+MAX_INFERENCE_WORKERS = 16   # concurrent Roboflow requests
+
+
+@functools.cache
+def get_inference_pool() -> ThreadPoolExecutor:
+    # inference_sdk keeps a requests.Session per calling thread for single-image
+    # calls, so long-lived threads keep TLS connections alive across videos
+    return ThreadPoolExecutor(max_workers=MAX_INFERENCE_WORKERS, thread_name_prefix="roboflow")
 
 
 class VisionDetector:
@@ -18,41 +30,50 @@ class VisionDetector:
         self.roboflow_client = InferenceHTTPClient(
             api_url="https://serverless.roboflow.com",
             api_key=Config.ROBOFLOW_API_KEY
+        ).configure(
+            # Drop low-confidence boxes in the server's post-processing, not after download
+            InferenceConfiguration(confidence_threshold=ROBOFLOW_CONFIDENCE_THRESHOLD)
         )
 
-    def _resize(self, image: Image.Image) -> Image.Image:
-        w, h = image.size
-        if max(w, h) > MAX_DIMENSION:
-            scale = MAX_DIMENSION / max(w, h)
-            image = image.resize((int(w * scale), int(h * scale)), Image.LANCZOS)
-        return image
+    def _parse_predictions(self, frame: Frame, result: dict) -> list[Detection]:
+        raw_preds = result.get("predictions", [])
+        # The server already applies the threshold; re-check in case it is ever ignored
+        kept = [p for p in raw_preds if p["confidence"] >= ROBOFLOW_CONFIDENCE_THRESHOLD]
 
-    def _run_roboflow(self, frame: Frame) -> list[Detection]:
+        # Frames run concurrently, so collect this frame's log and print it as one block
+        log = [f"  [Roboflow] Frame {frame.frame_num} (t={frame.timestamp:.1f}s): "
+               f"{len(raw_preds)} raw predictions, {len(kept)} kept"]
+        if Config.DEBUG:   # per-prediction lines cost an f-string each
+            log.extend(
+                f"    {'✓' if p['confidence'] >= ROBOFLOW_CONFIDENCE_THRESHOLD else '✗ filtered'} "
+                f"{p['class']}: {p['confidence']:.3f}"
+                for p in raw_preds
+            )
+        print("\n".join(log))
+
+        return [
+            Detection(
+                label=p["class"],
+                confidence=p["confidence"],
+                bbox=[p["x"], p["y"], p["width"], p["height"]]
+            )
+            for p in kept
+        ]
+
+    def _run_roboflow(self, frame: Frame) -> list[Detection] | None:
+        """Roboflow detections for one frame, or None if the request failed."""
         try:
+            # VideoProcessor already scaled the frame to ≤1280 px and JPEG-encoded it;
+            # the SDK sends base64 strings through as-is, so nothing is re-encoded
             result = self.roboflow_client.infer(
-                self._resize(frame.image),
-                model_id="construction-site-safety/27"
+                base64.b64encode(frame.image_bytes).decode("ascii"),
+                model_id=ROBOFLOW_MODEL_ID
             )
-            raw_preds = result.get("predictions", [])
-            print(f"  [Roboflow] Frame {frame.frame_num} (t={frame.timestamp:.1f}s): "
-                  f"{len(raw_preds)} raw predictions")
-
-            detections = []
-            for p in raw_preds:
-                conf, label = p["confidence"], p["class"]
-                ok = conf >= ROBOFLOW_CONFIDENCE_THRESHOLD
-                print(f"    {'✓' if ok else '✗ filtered'} {label}: {conf:.3f}")
-                if ok:
-                    detections.append(Detection(
-                        label=label,
-                        confidence=conf,
-                        bbox=[p["x"], p["y"], p["width"], p["height"]]
-                    ))
-            return detections
+            return self._parse_predictions(frame, result)
 
         except Exception as e:
             print(f"  [Roboflow] Frame {frame.frame_num} error: {e}")
-            return []
+            return None
 
     def detect(self, frames: list[Frame]) -> list[Detection]:
         if not frames:
@@ -60,13 +81,38 @@ class VisionDetector:
             return []
 
         print(f"[VisionDetector] Processing {len(frames)} frames...")
-        all_detections = []
 
-        for frame in frames:
-            all_detections.extend(self._run_roboflow(frame))
+        # Only a frame whose dHash exactly matches an earlier frame of this video
+        # reuses its predictions; a near match can hide a worker who just walked in.
+        # Nothing is kept across calls: one detector serves every Streamlit session
+        hashes  = [frame.dhash if frame.dhash is not None else dhash(frame.image) for frame in frames]
+        results = [None] * len(frames)
+        reuse   = {}     # frame index -> index of the identical frame being inferred
+        pending = []     # frame indices to infer
+        first_by_hash = {}   # dhash -> index of the first pending frame with it
+        for i, h in enumerate(hashes):
+            same = first_by_hash.get(h)
+            if same is not None:
+                reuse[i] = same
+                print(f"  [Roboflow] Frame {frames[i].frame_num}: identical to Frame "
+                      f"{frames[same].frame_num}, reusing its predictions")
+            else:
+                first_by_hash[h] = i
+                pending.append(i)
+
+        # Each frame is one network-bound HTTP call; map keeps frame order
+        inferred = get_inference_pool().map(self._run_roboflow, [frames[i] for i in pending])
+        for i, detections in zip(pending, inferred):
+            results[i] = detections or []
+        for i, same in reuse.items():
+            results[i] = results[same]
+
+        all_detections = list(chain.from_iterable(results))
 
         print(f"\n[VisionDetector] ── Detection Summary ──")
         print(f"  Frames processed : {len(frames)}")
+        print(f"  Roboflow calls   : {len(pending)} "
+              f"({len(frames) - len(pending)} reused from identical frames)")
         print(f"  Total detections : {len(all_detections)}")
         for label, count in sorted(Counter(d.label for d in all_detections).items()):
             print(f"    {label}: {count}x")
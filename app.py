@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+import shutil
 from config import Config
 from graph import SafetyGraph
 from utils import subscribe_email
@@ -44,7 +45,7 @@ def ensure_osha_ingested():
             count = client.count(Config.QDRANT_COLLECTION).count
             if count > 0:
                 return f"✅ OSHA knowledge base ready ({count} chunks)"
-        pdf_path = os.path.join(Config.DATA_DIR, "docs", "CAL_OSHA.pdf")
+        pdf_path = Config.OSHA_PDF_PATH
         if not os.path.exists(pdf_path):
             return "⚠️ CAL_OSHA.pdf not found in data/docs/ — skipping ingestion"
         from ingestion import ingest
@@ -54,23 +55,37 @@ def ensure_osha_ingested():
     except Exception as e:
         return f"⚠️ Qdrant not reachable — RAG disabled ({e})"
 
-with st.spinner("Checking OSHA knowledge base..."):
-    qdrant_status = ensure_osha_ingested()
-st.sidebar.caption(qdrant_status)
+@st.cache_resource(show_spinner=False)
+def get_safety_graph():
+    # One graph per server process: Bedrock, Roboflow, embedding models and the
+    # Qdrant client are built once and shared by every analysis and session
+    return SafetyGraph()
 
 uploaded_file = st.file_uploader("Upload Construction Site Video", type=["mp4", "mov", "avi"])
 
 if uploaded_file is not None:
-    video_path = os.path.join(Config.INPUT_DIR, uploaded_file.name)
-    with open(video_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+    # One directory per upload: same-named videos from different users don't
+    # collide, and reruns of the script don't rewrite a file already on disk
+    upload_dir = os.path.join(Config.INPUT_DIR, uploaded_file.file_id)
+    video_path = os.path.join(upload_dir, uploaded_file.name)
+    if not os.path.exists(video_path):
+        os.makedirs(upload_dir, exist_ok=True)
+        tmp_path = video_path + ".part"
+        with open(tmp_path, "wb") as f:
+            shutil.copyfileobj(uploaded_file, f, length=1024 * 1024)
+        os.replace(tmp_path, video_path)
     st.success(f"✅ Video uploaded: {uploaded_file.name}")
     
     # Show video preview
     st.video(video_path)
 
     if st.button("🔍 Analyze Safety"):
-        
+
+        # Checked on first analysis rather than page load; cached afterwards
+        with st.spinner("Checking OSHA knowledge base..."):
+            qdrant_status = ensure_osha_ingested()
+        st.caption(qdrant_status)
+
         # ── Live Pipeline Progress ────────────────────────────────────────
         st.header("⚙️ Pipeline Execution")
 
@@ -84,7 +99,7 @@ if uploaded_file is not None:
         }
 
         with st.status("Running Safety Analysis Pipeline...", expanded=True) as status:
-            graph = SafetyGraph()
+            graph = get_safety_graph()
             result = {}
 
             for node_name, partial_state in graph.stream(video_path):
@@ -138,7 +153,8 @@ if uploaded_file is not None:
         # ── Violations ────────────────────────────────────────────────────
         if violations:
             st.subheader("⚠️ Detected Violations")
-            for i, v in enumerate(violations):
+            # Most severe first
+            for i, v in enumerate(sorted(violations, key=lambda v: v.severity.rank, reverse=True)):
                 with st.expander(f"Violation {i+1}: {v.type} — {v.severity.value}", expanded=True):
                     col1, col2, col3 = st.columns(3)
                     col1.metric("Confidence", f"{v.confidence:.0%}")
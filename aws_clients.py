@@ -0,0 +1,35 @@
+import functools
+import boto3
+from botocore.config import Config as BotoConfig
+from config import Config
+
+# Sized for the concurrent Bedrock calls made by batched report generation;
+# adaptive retries back off client-side when Bedrock throttles
+BEDROCK_CLIENT_CONFIG = BotoConfig(
+    max_pool_connections=50,
+    retries={"mode": "adaptive", "max_attempts": 5},
+    tcp_keepalive=True,
+)
+SNS_CLIENT_CONFIG = BotoConfig(max_pool_connections=20, tcp_keepalive=True)
+
+
+@functools.cache
+def get_session() -> boto3.Session:
+    """One Session per process — uses system credentials by default, .env creds only as fallback."""
+    kwargs = {}
+    if Config.AWS_ACCESS_KEY_ID and Config.AWS_SECRET_ACCESS_KEY:
+        kwargs["aws_access_key_id"]     = Config.AWS_ACCESS_KEY_ID
+        kwargs["aws_secret_access_key"] = Config.AWS_SECRET_ACCESS_KEY
+    return boto3.Session(**kwargs)
+
+
+@functools.cache
+def get_bedrock_client(region: str = Config.AWS_REGION):
+    """Shared bedrock-runtime client; boto3 clients are thread-safe and keep their connection pool."""
+    return get_session().client("bedrock-runtime", region_name=region, config=BEDROCK_CLIENT_CONFIG)
+
+
+@functools.cache
+def get_sns_client():
+    """Shared SNS client, in the session's default region."""
+    return get_session().client("sns", config=SNS_CLIENT_CONFIG)
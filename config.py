@@ -8,6 +8,7 @@ class Config:
     # General
     PROJECT_NAME = os.getenv("PROJECT_NAME", "Construction Safety AI")
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    DEBUG = LOG_LEVEL.upper() == "DEBUG"
 
     # Paths
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -16,6 +17,12 @@ class Config:
     PROCESSING_DIR = os.path.join(DATA_DIR, "processing")
     VECTOR_DB_DIR = os.path.join(DATA_DIR, "vector_db")
     REPORTS_DIR = os.path.join(DATA_DIR, "reports")
+    CACHE_DIR = os.path.join(DATA_DIR, "cache")
+    EMBEDDING_CACHE_PATH = os.path.join(CACHE_DIR, "embeddings.sqlite")
+    LLM_CACHE_DIR = os.path.join(CACHE_DIR, "llm")
+    OSHA_PDF_PATH = os.path.join(DATA_DIR, "docs", "CAL_OSHA.pdf")
+    # {collection: SHA-256 of the PDF it was last ingested from}; lets ingest() skip unchanged files
+    INGEST_CACHE_PATH = os.path.join(DATA_DIR, ".ingest_cache.json")
 
     # AWS
     AWS_REGION = os.getenv("AWS_DEFAULT_REGION", "us-east-1")
@@ -23,6 +30,9 @@ class Config:
     # Credentials — None means "not in .env, let boto3 use its own chain"
     AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID") or None
     AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY") or None
+    # Mark static system prompts as a Bedrock prompt-cache checkpoint. Off by default:
+    # the prefix must reach the model's minimum (1,024 tokens Sonnet, 2,048 3.5 Haiku)
+    BEDROCK_PROMPT_CACHE = os.getenv("BEDROCK_PROMPT_CACHE", "false").lower() in ("1", "true", "yes")
 
     # Roboflow
     ROBOFLOW_API_KEY = os.getenv("ROBOFLOW_API_KEY")
@@ -32,8 +42,15 @@ class Config:
     # Qdrant
     QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
     QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
+    QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", 6334))
+    QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", 10))
     QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION_NAME", "osha_regulations")
     MODEL_NAME = "BAAI/bge-small-en-v1.5"
+    # ONNX Runtime intra-op threads per embedding model; None lets onnxruntime use every core
+    EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", 0)) or None
+    # Hybrid-search RRF rank constant; None keeps Qdrant's built-in default.
+    # Setting it needs Qdrant server and qdrant-client >= 1.16
+    RRF_K = int(os.getenv("RRF_K", 0)) or None
 
     # Slack
     SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL")
@@ -43,10 +60,18 @@ class Config:
     S3_REPORTS_BUCKET = os.getenv("S3_REPORTS_BUCKET")  # e.g. 'my-safety-reports'
     S3_PRESIGNED_EXPIRY = int(os.getenv("S3_PRESIGNED_EXPIRY", 86400))  # 24 h
 
+    # Report PDF renderer: "reportlab" (pure-Python, default) or "none" to build DOCX only
+    PDF_BACKEND = os.getenv("PDF_BACKEND", "reportlab").lower()
+    if PDF_BACKEND not in ("reportlab", "none"):
+        raise ValueError(f"Unknown PDF_BACKEND: {PDF_BACKEND!r} (expected 'reportlab' or 'none')")
+
+    # Exact-match cache of LLM report text, keyed by model + prompt + context
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
     @classmethod
     def ensure_dirs(cls):
         """Ensure all data directories exist."""
-        for path in [cls.INPUT_DIR, cls.PROCESSING_DIR, cls.VECTOR_DB_DIR, cls.REPORTS_DIR]:
+        for path in [cls.INPUT_DIR, cls.PROCESSING_DIR, cls.VECTOR_DB_DIR, cls.REPORTS_DIR, cls.CACHE_DIR, cls.LLM_CACHE_DIR]:
             os.makedirs(path, exist_ok=True)
 
 # Create directories on import
@@ -41,10 +41,16 @@ class SafetyGraph:
 
         workflow.set_entry_point("process_video")
         workflow.add_edge("process_video",       "detect_objects")
+        # RAG retrieval and the Bedrock risk call only need detections, so they
+        # run in the same step; generate_report waits for both
         workflow.add_edge("detect_objects",      "retrieve_regulations")
-        workflow.add_edge("retrieve_regulations","assess_risk")
+        workflow.add_edge("detect_objects",      "assess_risk")
+        workflow.add_edge("retrieve_regulations","generate_report")
         workflow.add_edge("assess_risk",         "generate_report")
-        workflow.add_edge("generate_report",     "send_alerts")
+        # The SNS alert only needs the risk assessment, so it goes out while
+        # the report's Bedrock call is still running
+        workflow.add_edge("assess_risk",         "send_alerts")
+        workflow.add_edge("generate_report",     END)
         workflow.add_edge("send_alerts",         END)
 
         return workflow.compile()
@@ -65,18 +71,19 @@ class SafetyGraph:
         return {"regulations": regs}
 
     def assess_risk(self, state: GraphState):
-        risk = self.risk_assessor.assess(
-            state["detections"],
-            regulations=state.get("regulations", [])
-        )
+        # Runs alongside retrieve_regulations, so scoring uses detections only;
+        # the retrieved regulations still go into the report
+        risk = self.risk_assessor.assess(state["detections"])
         print(f"[assess_risk] Score: {risk.risk_score} | Level: {risk.alert_level}")
         return {"risk_assessment": risk}
 
     def generate_report(self, state: GraphState):
-        result = ProcessingResult(
+        # Fields come straight from validated state, so skip re-validation
+        result = ProcessingResult.model_construct(
             video_id=state["video_path"],
             risk_assessment=state["risk_assessment"],
             regulations=state.get("regulations", []),
+            frames_analyzed=len(state.get("frames", [])),
             report_path=None
         )
         # Pass raw detections so report has full per-label counts + confidence
@@ -87,10 +94,7 @@ class SafetyGraph:
         return {"final_report": report}
 
     def send_alerts(self, state: GraphState):
-        alerts_sent = run_alert_agent(
-            state["risk_assessment"],
-            report_path=state.get("final_report")
-        )
+        alerts_sent = run_alert_agent(state["risk_assessment"])
         return {"alerts_sent": alerts_sent}
 
     def _initial_state(self, video_path: str) -> GraphState:
@@ -99,7 +103,7 @@ class SafetyGraph:
             frames=[],
             detections=[],
             regulations=[],
-            risk_assessment=RiskAssessment(
+            risk_assessment=RiskAssessment.model_construct(
                 risk_score=0,
                 alert_level=AlertLevel.LOW,
                 violations=[]
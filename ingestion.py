@@ -1,15 +1,19 @@
+import os
 import re
-from langchain_community.document_loaders import PyMuPDFLoader
+import json
+import hashlib
+import fitz  # PyMuPDF
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
-from fastembed import SparseTextEmbedding
+from fastembed import TextEmbedding, SparseTextEmbedding
 from qdrant_client import QdrantClient, models
 from config import Config
 
 DENSE_MODEL  = "BAAI/bge-small-en-v1.5"
 SPARSE_MODEL = "prithivida/Splade_PP_en_v1"
 EMBEDDING_SIZE = 384
-BATCH_SIZE = 32
+BATCH_SIZE = 256   # embedding batch and Qdrant upsert slab
+UPLOAD_PARALLEL = 4   # upload_points worker processes
+EMBED_WORKERS = max(1, (os.cpu_count() or 2) // 2)   # data-parallel processes per embedding model
 
 # ---------------------------------------------------------------------------
 # Text Cleaning
@@ -30,38 +34,37 @@ SKIP_PATTERNS = [
     r'about this pocket guide',
 ]
 
+# All noise patterns as one alternation, so each chunk is scanned once
+SKIP_RE = re.compile("(?:" + ")|(?:".join(SKIP_PATTERNS) + ")", re.IGNORECASE)
 
-def is_useful_chunk(text: str) -> bool:
-    text_lower = text.lower()
+# Private-use ligature glyphs the PDF extractor leaves behind; str.translate
+# replaces them all in one pass
+LIGATURE_TABLE = str.maketrans({
+    '\ue03e': 'fl', '\ue03f': 'fi', '\ue040': 'ff',
+    '\ue050': 'fi', '\ue051': 'fl', '\ue052': 'ff',
+    '\ue053': 'ffi', '\ue054': 'ffl',
+})
 
-    # Skip if too short to be a real regulation
-    if len(text.strip()) < 100:
-        return False
+HYPHEN_BREAK_RE = re.compile(r'-\n')
+NEWLINES_RE     = re.compile(r'\n+')
+MULTI_SPACE_RE  = re.compile(r'\s{2,}')
 
-    # Skip if matches any noise pattern
-    for pattern in SKIP_PATTERNS:
-        if re.search(pattern, text_lower):
-            return False
 
-    return True
+def is_useful_chunk(text: str) -> bool:
+    # Skip if too short to be a real regulation, or if it matches any noise pattern
+    return len(text.strip()) >= 100 and SKIP_RE.search(text) is None
 
 
 def clean_text(text: str) -> str:
     """Fix common PDF extraction artifacts before embedding."""
-    ligature_map = {
-        '\ue03e': 'fl', '\ue03f': 'fi', '\ue040': 'ff',
-        '\ue050': 'fi', '\ue051': 'fl', '\ue052': 'ff',
-        '\ue053': 'ffi', '\ue054': 'ffl',
-    }
-    for char, replacement in ligature_map.items():
-        text = text.replace(char, replacement)
+    text = text.translate(LIGATURE_TABLE)
 
     # Fix hyphenated line breaks e.g. "retro-\nreflective" -> "retroreflective"
-    text = re.sub(r'-\n', '', text)
+    text = HYPHEN_BREAK_RE.sub('', text)
 
     # Normalize whitespace
-    text = re.sub(r'\n+', ' ', text)
-    text = re.sub(r'\s{2,}', ' ', text)
+    text = NEWLINES_RE.sub(' ', text)
+    text = MULTI_SPACE_RE.sub(' ', text)
 
     return text.strip()
 
@@ -70,39 +73,43 @@ def clean_text(text: str) -> str:
 # Load & Chunk
 # ---------------------------------------------------------------------------
 
-def load_and_chunk(pdf_path: str):
-    loader = PyMuPDFLoader(pdf_path)
-    documents = loader.load()
-
+def iter_useful_chunks(pdf_path: str):
+    """
+    Yield (page_num, text) for each deduplicated, noise-filtered chunk, one page at a time.
+    Pages are read straight from PyMuPDF, cleaned and split lazily, so the whole
+    corpus is never held in memory at the intermediate stages.
+    """
     # Skip front matter (cover, TOC, copyright)
-    SKIP_PAGES = set(range(0, 5))
-    documents = [doc for doc in documents if doc.metadata.get("page", 0) not in SKIP_PAGES]
-
-    # Clean text before splitting
-    for doc in documents:
-        doc.page_content = clean_text(doc.page_content)
+    FIRST_PAGE = 5
 
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=150,
         separators=["\n\n", "\n", ".", " "]
     )
-    chunks = splitter.split_documents(documents)
 
-    # Deduplicate
-    seen = set()
-    unique_chunks = []
-    for chunk in chunks:
-        h = hash(chunk.page_content[:200])
-        if h not in seen:
-            seen.add(h)
-            unique_chunks.append(chunk)
-
-    # Filter noise
-    useful_chunks = [c for c in unique_chunks if is_useful_chunk(c.page_content)]
-
-    print(f"✓ {len(chunks)} chunks → {len(unique_chunks)} after dedup → {len(useful_chunks)} after noise filter")
-    return useful_chunks
+    seen: set[bytes] = set()
+    total = unique = useful = 0
+    with fitz.open(pdf_path) as pdf:
+        for page_num in range(FIRST_PAGE, pdf.page_count):
+            # Clean text before splitting
+            page_text = clean_text(pdf[page_num].get_text("text"))
+
+            for text in splitter.split_text(page_text):
+                total += 1
+                # Deduplicate on a 128-bit digest of the full text, stable across runs
+                h = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+                if h in seen:
+                    continue
+                seen.add(h)
+                unique += 1
+                # Filter noise
+                if not is_useful_chunk(text):
+                    continue
+                useful += 1
+                yield page_num, text
+
+    print(f"✓ {total} chunks → {unique} after dedup → {useful} after noise filter")
 
 
 # ---------------------------------------------------------------------------
@@ -127,7 +134,17 @@ def setup_collection(client: QdrantClient, collection_name: str):
             "sparse": models.SparseVectorParams(
                 index=models.SparseIndexParams(on_disk=False)
             )
-        }
+        },
+        # int8 copies of the dense vectors kept in RAM: 4x smaller, faster HNSW
+        # traversal. The retriever's dense prefetch (DENSE_PREFETCH_PARAMS) asks
+        # Qdrant to rescore its candidates against the original floats
+        quantization_config=models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True,
+            )
+        ),
     )
     print(f"✓ Created hybrid collection: {collection_name}")
 
@@ -136,48 +153,105 @@ def setup_collection(client: QdrantClient, collection_name: str):
 # Ingest
 # ---------------------------------------------------------------------------
 
-def ingest(pdf_path: str):
-    chunks = load_and_chunk(pdf_path)
+def fingerprint(pdf_path: str) -> str:
+    """SHA-256 of the PDF's bytes, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_ingest_cache() -> dict:
+    try:
+        with open(Config.INGEST_CACHE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_ingest_cache(collection_name: str, digest: str | None):
+    cache = _read_ingest_cache()
+    cache[collection_name] = digest
+    with open(Config.INGEST_CACHE_PATH, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+
+
+def iter_points(pdf_path: str, chunks, all_dense, all_sparse):
+    """Yield one PointStruct per (page_num, text) chunk, pulling vectors from the embed streams as needed."""
+    for i, ((page_num, text), dense_vec, sparse_vec) in enumerate(zip(chunks, all_dense, all_sparse)):
+        # tolist() converts each array in one C call; model_construct then skips
+        # Pydantic re-checking every element of lists that are already plain floats/ints
+        yield models.PointStruct.model_construct(
+            id=i,
+            vector={
+                "dense": dense_vec.tolist(),
+                "sparse": models.SparseVector.model_construct(
+                    indices=sparse_vec.indices.tolist(),
+                    values=sparse_vec.values.tolist()
+                )
+            },
+            payload={
+                "text":     text,
+                "source":   pdf_path,
+                "page":     page_num,
+                "chunk_id": i,
+            }
+        )
+        if (i + 1) % BATCH_SIZE == 0:
+            print(f"✓ Embedded {i + 1} chunks")
 
-    # Load both embedding models
-    dense_embeddings  = FastEmbedEmbeddings(model_name=DENSE_MODEL)
-    sparse_embeddings = SparseTextEmbedding(model_name=SPARSE_MODEL)
 
-    client = QdrantClient(host=Config.QDRANT_HOST, port=Config.QDRANT_PORT)
-    setup_collection(client, Config.QDRANT_COLLECTION)
+def ingest(pdf_path: str):
+    # gRPC ships vectors as protobuf float arrays instead of JSON text
+    client = QdrantClient(
+        host=Config.QDRANT_HOST,
+        port=Config.QDRANT_PORT,
+        grpc_port=Config.QDRANT_GRPC_PORT,
+        prefer_grpc=True,
+        timeout=Config.QDRANT_TIMEOUT,
+    )
 
-    for batch_start in range(0, len(chunks), BATCH_SIZE):
-        batch_end    = min(batch_start + BATCH_SIZE, len(chunks))
-        batch_chunks = chunks[batch_start:batch_end]
-        batch_texts  = [chunk.page_content for chunk in batch_chunks]
-
-        # Embed — dense and sparse
-        batch_dense  = dense_embeddings.embed_documents(batch_texts)
-        batch_sparse = list(sparse_embeddings.embed(batch_texts))
-
-        points = [
-            models.PointStruct(
-                id=batch_start + i,
-                vector={
-                    "dense": dense_vec,
-                    "sparse": models.SparseVector(
-                        indices=sparse_vec.indices.tolist(),
-                        values=sparse_vec.values.tolist()
-                    )
-                },
-                payload={
-                    "text":     chunk.page_content,
-                    "source":   chunk.metadata.get("source", ""),
-                    "page":     chunk.metadata.get("page", 0),
-                    "chunk_id": batch_start + i,
-                }
-            )
-            for i, (chunk, dense_vec, sparse_vec) in enumerate(zip(batch_chunks, batch_dense, batch_sparse))
-        ]
+    # Skip the whole embed + upload when this exact PDF already populated the collection
+    digest = fingerprint(pdf_path)
+    if (_read_ingest_cache().get(Config.QDRANT_COLLECTION) == digest
+            and client.collection_exists(Config.QDRANT_COLLECTION)
+            and client.count(Config.QDRANT_COLLECTION).count > 0):
+        print(f"✓ Cache hit: {pdf_path} unchanged since last ingestion, skipping")
+        return
+
+    # Only the final chunks are kept: both embedding passes and the payloads need them
+    chunks = list(iter_useful_chunks(pdf_path))
+    texts  = [text for _, text in chunks]
+
+    # Load both embedding models; each data-parallel worker runs its own
+    # single-threaded ONNX session
+    dense_embeddings  = TextEmbedding(model_name=DENSE_MODEL, threads=1)
+    sparse_embeddings = SparseTextEmbedding(model_name=SPARSE_MODEL, threads=1)
+
+    # Forget the old fingerprint first, so a run that dies mid-upload is never a cache hit
+    _write_ingest_cache(Config.QDRANT_COLLECTION, None)
+    setup_collection(client, Config.QDRANT_COLLECTION)
 
-        client.upsert(collection_name=Config.QDRANT_COLLECTION, points=points)
-        print(f"✓ Uploaded batch {batch_start}–{batch_end}")
+    # One embed call per model over the whole corpus. Both stream from their own
+    # worker pool, half the cores each, and iter_points consumes them in
+    # lockstep, so dense and sparse tokenization and inference run side by side
+    all_dense  = dense_embeddings.embed(texts, batch_size=BATCH_SIZE, parallel=EMBED_WORKERS)
+    all_sparse = sparse_embeddings.embed(texts, batch_size=BATCH_SIZE, parallel=EMBED_WORKERS)
+
+    # upload_points batches, retries and spreads requests over UPLOAD_PARALLEL
+    # processes, so uploads overlap with the embedder producing the next points.
+    # wait=True: the corpus is searchable once this returns
+    client.upload_points(
+        collection_name=Config.QDRANT_COLLECTION,
+        points=iter_points(pdf_path, chunks, all_dense, all_sparse),
+        batch_size=BATCH_SIZE,
+        parallel=UPLOAD_PARALLEL,
+        max_retries=3,
+        wait=True,
+    )
 
+    _write_ingest_cache(Config.QDRANT_COLLECTION, digest)
     print(f"\n✓ Ingestion complete: {len(chunks)} chunks stored in '{Config.QDRANT_COLLECTION}'")
 
 
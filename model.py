@@ -1,17 +1,9 @@
-import boto3
-import json
+import orjson
 import io
 import base64
 from PIL import Image
 from config import Config
-
-
-def _make_bedrock_client(region: str):
-    kwargs = {"service_name": "bedrock-runtime", "region_name": region}
-    if Config.AWS_ACCESS_KEY_ID and Config.AWS_SECRET_ACCESS_KEY:
-        kwargs["aws_access_key_id"]     = Config.AWS_ACCESS_KEY_ID
-        kwargs["aws_secret_access_key"] = Config.AWS_SECRET_ACCESS_KEY
-    return boto3.client(**kwargs)
+from aws_clients import get_bedrock_client
 
 
 def _is_nova(model_id: str) -> bool:
@@ -27,7 +19,7 @@ class BedrockModel:
         region:     str = Config.AWS_REGION,
         max_tokens: int = 2048,
     ):
-        self.client     = _make_bedrock_client(region)
+        self.client     = get_bedrock_client(region)
         self.model_id   = model_id
         self.max_tokens = max_tokens
         self.is_nova    = _is_nova(model_id)
@@ -39,21 +31,33 @@ class BedrockModel:
             cls._instance = cls()
         return cls._instance
 
-    def _build_body_text(self, system_prompt: str, user_message: str) -> dict:
-        """Build request body for text-only call — handles Claude vs Nova format."""
+    def _build_body_text(self, system_prompt: str, user_message: str,
+                         cache_system: bool = False) -> dict:
+        """
+        Build request body for text-only call — handles Claude vs Nova format.
+        cache_system marks the system prompt as a prompt-cache checkpoint so
+        Bedrock can skip re-processing it on later calls within the cache TTL.
+        """
         if self.is_nova:
             # Nova uses "system" as a list of objects, not a string
+            system = [{"text": system_prompt}]
+            if cache_system:
+                system.append({"cachePoint": {"type": "default"}})
             return {
-                "system":     [{"text": system_prompt}],
+                "system":     system,
                 "messages":   [{"role": "user", "content": [{"text": user_message}]}],
                 "inferenceConfig": {"maxTokens": self.max_tokens}
             }
         else:
             # Claude format
+            system = system_prompt
+            if cache_system:
+                system = [{"type": "text", "text": system_prompt,
+                           "cache_control": {"type": "ephemeral"}}]
             return {
                 "anthropic_version": "bedrock-2023-05-31",
                 "max_tokens":        self.max_tokens,
-                "system":            system_prompt,
+                "system":            system,
                 "messages":          [{"role": "user", "content": user_message}]
             }
 
@@ -104,6 +108,16 @@ class BedrockModel:
             # Claude: content[0].text
             return response["content"][0]["text"].strip()
 
+    def _log_cache_usage(self, response: dict):
+        """Print prompt-cache read/write token counts when the model reports them."""
+        usage = response.get("usage") or {}
+        if self.is_nova:
+            read, write = usage.get("cacheReadInputTokenCount"), usage.get("cacheWriteInputTokenCount")
+        else:
+            read, write = usage.get("cache_read_input_tokens"), usage.get("cache_creation_input_tokens")
+        if read or write:
+            print(f"[BedrockModel] Prompt cache: {read or 0} read, {write or 0} written tokens")
+
     def _clean(self, text: str) -> str:
         """Strip markdown code fences if present."""
         if text.startswith("```"):
@@ -112,40 +126,44 @@ class BedrockModel:
                 text = text[4:]
         return text.strip()
 
-    def invoke(self, system_prompt: str, user_message: str) -> str:
+    def invoke(self, system_prompt: str, user_message: str, cache_system: bool = False) -> str:
         """Text-only call. Returns clean string."""
-        body     = self._build_body_text(system_prompt, user_message)
+        cache_system = cache_system and Config.BEDROCK_PROMPT_CACHE
+        body     = self._build_body_text(system_prompt, user_message, cache_system)
         response = self.client.invoke_model(
             modelId=self.model_id,
-            body=json.dumps(body)
+            body=orjson.dumps(body)
         )
-        result = json.loads(response["body"].read())
+        result = orjson.loads(response["body"].read())
+        if cache_system:
+            self._log_cache_usage(result)
         return self._clean(self._extract_text(result))
 
     def invoke_json(self, system_prompt: str, user_message: str) -> dict:
         """Text-only call, returns parsed JSON."""
-        return json.loads(self.invoke(system_prompt, user_message))
+        return orjson.loads(self.invoke(system_prompt, user_message))
 
     def invoke_vision(self, prompt: str, image: Image.Image, max_dim: int = 1280) -> str:
         """Vision call with image + text prompt. Returns clean string."""
-        # Resize
+        # Resize — BILINEAR: the model re-patches the image anyway, LANCZOS only costs time
         w, h = image.size
         if max(w, h) > max_dim:
             scale = max_dim / max(w, h)
-            image = image.resize((int(w * scale), int(h * scale)), Image.LANCZOS)
+            image = image.resize((int(w * scale), int(h * scale)), Image.Resampling.BILINEAR)
 
         buf = io.BytesIO()
         image.save(buf, format="JPEG", quality=85)
-        img_b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
+        # getbuffer() exposes the encoded bytes without the copy getvalue() makes
+        img_b64 = base64.b64encode(buf.getbuffer()).decode("ascii")
 
         body     = self._build_body_vision(prompt, img_b64)
         response = self.client.invoke_model(
             modelId=self.model_id,
-            body=json.dumps(body)
+            body=orjson.dumps(body)
         )
-        result = json.loads(response["body"].read())
+        result = orjson.loads(response["body"].read())
         return self._clean(self._extract_text(result))
 
     def invoke_vision_json(self, prompt: str, image: Image.Image) -> list | dict:
         """Vision call, returns parsed JSON."""
-        return json.loads(self.invoke_vision(prompt, image))
+        return orjson.loads(self.invoke_vision(prompt, image))
@@ -1,8 +1,10 @@
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
-from PIL import Image
+
+if TYPE_CHECKING:
+    import numpy as np
 
 class AlertLevel(str, Enum):
     LOW = "LOW"
@@ -10,23 +12,77 @@ class AlertLevel(str, Enum):
     HIGH = "HIGH"
     CRITICAL = "CRITICAL"
 
+    @property
+    def rank(self) -> int:
+        """0 (LOW) to 3 (CRITICAL); the value stays a string on the wire."""
+        return _ALERT_RANK[self.value]
+
+    # Order by severity, not alphabetically as the str base class would ("CRITICAL" < "HIGH").
+    # Plain strings are coerced so `level >= "HIGH"` ranks too, instead of falling back to str order
+    @staticmethod
+    def _rank_of(other):
+        if isinstance(other, str):
+            return AlertLevel(other).rank
+        return NotImplemented
+
+    def __lt__(self, other):
+        rank = self._rank_of(other)
+        return NotImplemented if rank is NotImplemented else self.rank < rank
+
+    def __le__(self, other):
+        rank = self._rank_of(other)
+        return NotImplemented if rank is NotImplemented else self.rank <= rank
+
+    def __gt__(self, other):
+        rank = self._rank_of(other)
+        return NotImplemented if rank is NotImplemented else self.rank > rank
+
+    def __ge__(self, other):
+        rank = self._rank_of(other)
+        return NotImplemented if rank is NotImplemented else self.rank >= rank
+
+_ALERT_RANK = {"LOW": 0, "MEDIUM": 1, "HIGH": 2, "CRITICAL": 3}
+
+# Case-folded: the detector emits both "Machinery" and "machinery"
+MACHINERY_LABELS = frozenset({"excavator", "wheel loader", "machinery", "dump truck"})
+
+def is_machinery(label: str) -> bool:
+    """Whether a detection label is heavy equipment, ignoring case."""
+    return label.casefold() in MACHINERY_LABELS
+
+# Models are built once and only read afterwards: no assignment validation,
+# schema built on first use rather than at import
+IMMUTABLE = ConfigDict(frozen=True, validate_assignment=False, defer_build=True)
+
 class Frame(BaseModel):
     """Represents a single video frame extracted for analysis."""
+    model_config = IMMUTABLE
+
     frame_num: int
     timestamp: float
-    image: Image.Image  # PIL Image object directly
-    
-    class Config:
-        arbitrary_types_allowed = True
+    image_bytes: bytes  # JPEG-encoded frame; a fraction of the decoded size while it sits in graph state
+    dhash: int | None = None  # 64-bit difference hash, set once by VideoProcessor and reused downstream
+
+    @property
+    def image(self) -> "np.ndarray":
+        """Decode on demand to uint8 (H, W, 3) BGR, as OpenCV expects. Not cached."""
+        # Imported here so modules that only use the schemas don't load OpenCV
+        import cv2
+        import numpy as np
+        return cv2.imdecode(np.frombuffer(self.image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
 
 class Detection(BaseModel):
     """Object detected in a frame."""
+    model_config = IMMUTABLE
+
     label: str
     confidence: float
     bbox: List[float] # [x, y, w, h]
 
 class Violation(BaseModel):
     """Safety violation detected."""
+    model_config = IMMUTABLE
+
     type: str
     confidence: float
     duration_seconds: float = 0.0
@@ -36,6 +92,8 @@ class Violation(BaseModel):
     
 class RiskAssessment(BaseModel):
     """Overall risk assessment for a sequence or event."""
+    model_config = IMMUTABLE
+
     risk_score: int = Field(..., ge=0, le=100)
     alert_level: AlertLevel
     violations: List[Violation] = []
@@ -43,14 +101,19 @@ class RiskAssessment(BaseModel):
 
 class Regulation(BaseModel):
     """OSHA regulation reference."""
+    model_config = IMMUTABLE
+
     citation: str
     text: str
     source: str
 
 class ProcessingResult(BaseModel):
     """Final output object for the reporting agent."""
+    model_config = IMMUTABLE
+
     video_id: str
     risk_assessment: RiskAssessment
     regulations: List[Regulation]
+    frames_analyzed: int = 0
     report_path: Optional[str] = None
     alerts_sent: List[str] = []
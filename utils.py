@@ -1,21 +1,20 @@
-import boto3
 import sys
+import time
+import functools
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from config import Config
+from aws_clients import get_sns_client
 
-def _make_sns_client():
-    """Build SNS client — uses system credentials by default, .env creds only as fallback."""
-    kwargs = {}
-    if Config.AWS_ACCESS_KEY_ID and Config.AWS_SECRET_ACCESS_KEY:
-        kwargs["aws_access_key_id"]     = Config.AWS_ACCESS_KEY_ID
-        kwargs["aws_secret_access_key"] = Config.AWS_SECRET_ACCESS_KEY
-    return boto3.client("sns", **kwargs)
+sns = get_sns_client()
 
-sns = _make_sns_client()
+SUBSCRIPTION_CACHE_TTL = 60   # seconds a subscription lookup is trusted
+# (topic_arn, email) -> (expires_at, result of _is_email_subscribed)
+_subscription_cache: dict[tuple[str, str], tuple[float, dict]] = {}
 
+@functools.cache
 def _get_or_create_topic(topic_name: str = "risk_alerts") -> str:
-    """Creates the SNS topic if it doesn't exist and returns its ARN."""
+    """Creates the SNS topic if it doesn't exist and returns its ARN (cached: the ARN never changes)."""
     response = sns.create_topic(Name=topic_name)  # idempotent
     return response["TopicArn"]
 
@@ -28,6 +27,7 @@ def initialize_sns(topic_name: str = 'risk_alerts') -> str:
         print(f"{Config.ALERT_EMAIL_DEST} already subscribed: {status['status']}")
     else:
         sns.subscribe(TopicArn=topic_arn, Protocol='email', Endpoint=Config.ALERT_EMAIL_DEST)
+        _subscription_cache.pop((topic_arn, Config.ALERT_EMAIL_DEST), None)
         print(f"Subscribed {Config.ALERT_EMAIL_DEST} to {topic_arn}")
 
     return topic_arn
@@ -54,6 +54,7 @@ def subscribe_email(email: str, topic_name: str = "risk_alerts") -> dict:
                     "status": f"{email} is already subscribed and active."}
 
         sns.subscribe(TopicArn=topic_arn, Protocol="email", Endpoint=email)
+        _subscription_cache.pop((topic_arn, email), None)
         return {"ok": True, "pending": True,
                 "status": f"Confirmation email sent to {email}. Click the link in your inbox to activate alerts."}
     except Exception as e:
@@ -70,6 +71,16 @@ def publish_alert(topic_arn: str, subject: str, message: str) -> bool:
         return False
 
 def _is_email_subscribed(topic_arn: str, email_address: str) -> dict:
+    """Subscription status, walking the topic's subscription pages at most once per TTL."""
+    key = (topic_arn, email_address)
+    cached = _subscription_cache.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    status = _list_email_subscription(topic_arn, email_address)
+    _subscription_cache[key] = (time.monotonic() + SUBSCRIPTION_CACHE_TTL, status)
+    return status
+
+def _list_email_subscription(topic_arn: str, email_address: str) -> dict:
     paginator = sns.get_paginator('list_subscriptions_by_topic')
     for response in paginator.paginate(TopicArn=topic_arn):
         for sub in response['Subscriptions']: